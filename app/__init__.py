@@ -1,8 +1,11 @@
 from flask import Flask
 from config import Config
-from app.extensions import socketio, cors, db, login_manager, bcrypt, jwt
 
 def create_app(config_class=Config):
+    # Extensions (termasuk Firebase) baru di-import di sini, agar proses
+    # worker gambar yang meng-import app.services.* tidak ikut menginisialisasi
+    from app.extensions import socketio, cors, login_manager, bcrypt, jwt
+
     # 1. Setup Aplikasi
     app = Flask(__name__)
     app.config.from_object(config_class)
@@ -21,6 +24,8 @@ def create_app(config_class=Config):
     from app.routes.edit_routes import edit_api           # Editing Foto
     from app.routes.history_routes import history_bp      # History
     from app.routes.feedback_routes import feedback_bp    # Feedback (Baru)
+    from app.routes.metrics_routes import metrics_bp      # Metrics performa
+    from app import socket_events                         # Event Socket.IO (signaling & job)
 
     # 4. Registrasi Blueprint (Hanya Sekali per Fitur!)
     app.register_blueprint(style_bp)
@@ -31,6 +36,7 @@ def create_app(config_class=Config):
     app.register_blueprint(edit_api, url_prefix='/api/edit')
     app.register_blueprint(history_bp)
     app.register_blueprint(feedback_bp) # Feedback route
+    app.register_blueprint(metrics_bp)  # Metrics route
 
     # 5. Route Halaman Depan (Cek Server)
     @app.route('/')
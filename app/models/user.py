@@ -1,5 +1,6 @@
 from flask_login import UserMixin
-from app.extensions import login_manager, db
+from app.extensions import login_manager
+from app.services.user_cache import user_cache
 
 # Model user sederhana untuk sistem login/authorization
 # UserMixin memberikan fitur built-in untuk Flask-Login (is_authenticated, get_id, dll.)
@@ -14,13 +15,12 @@ class User(UserMixin):
 # Flask-Login otomatis memanggil ini saat session aktif
 @login_manager.user_loader
 def load_user(user_id):
-    # Ambil user dari Firestore berdasarkan ID dokumen
-    u = db.collection('users').document(user_id).get()
+    # Ambil user berdasarkan ID dokumen (memo request + cache TTL pendek)
+    data = user_cache.get(user_id)
     
     # Jika data user tersedia, konversi ke object User()
-    if u.exists:
-        data = u.to_dict()
-        return User(u.id, data['email'], data['full_name'], data['role'])
+    if data is not None:
+        return User(user_id, data['email'], data['full_name'], data['role'])
 
     # Jika tidak ditemukan, return None agar dianggap tidak login
     return None
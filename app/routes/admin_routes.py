@@ -18,8 +18,14 @@ from flask_login import (
 )
 from app.extensions import db, bcrypt   # Firestore DB & bcrypt
 from app.models.user import User        # Model User untuk Flask-Login
+from app.services.aggregates import aggregates, parse_rating  # Counter dashboard & rating 1–5
+from app.services.rollups import rollups        # Rollup aktivitas harian/per jam
+from app.services.user_cache import user_cache  # Cache dokumen user
+from app.utils.image_io import image_response   # Kirim foto profil biner
+from app.utils.pagination import clamp_limit, fetch_page  # Paginasi cursor
+from config import Config                       # Ukuran halaman admin
 from firebase_admin import firestore    # Firestore query (order_by)
-import collections                      # Untuk Counter (chart)
+import base64                           # Decode foto profil data URI
 
 
 # =========================
@@ -29,6 +35,9 @@ import collections                      # Untuk Counter (chart)
 # Blueprint admin dengan prefix /admin
 admin_bp = Blueprint('admin_bp', __name__, url_prefix='/admin')
 
+# Gambar pengganti untuk user tanpa foto profil
+PLACEHOLDER_PHOTO = 'https://via.placeholder.com/40'
+
 
 # =========================================================
 # 1. LOGIN ADMIN
@@ -101,70 +110,120 @@ def login():
 @admin_bp.route('/dashboard')
 @login_required
 def dashboard():
-    # Ambil semua user
-    users_ref = db.collection('users').stream()
-
-    # Ambil semua history
-    history_ref = db.collection('history').stream()
-
-    # Ambil semua feedback
-    feedback_ref = db.collection('feedbacks').stream()
-
-    # Convert ke list dictionary
-    users_list = [u.to_dict() for u in users_ref]
-    histories_list = [h.to_dict() for h in history_ref]
-    feedbacks_list = [f.to_dict() for f in feedback_ref]
-
-    # Hitung total data
-    total_users = len(users_list)
-    total_styles = len(histories_list)
-    total_feedbacks = len(feedbacks_list)
-
-    # Hitung rata-rata rating
-    avg_rating = 0
-    if total_feedbacks > 0:
-        total_stars = sum([f.get('rating', 0) for f in feedbacks_list])
-        avg_rating = round(total_stars / total_feedbacks, 1)
-
-    # Hitung jumlah feedback per rating (1–5)
-    rating_counts = collections.Counter([f.get('rating', 0) for f in feedbacks_list])
+    # Ringkasan dari dokumen agregat (satu read, tanpa scan koleksi)
+    summary = aggregates.read()
 
     # Data chart feedback (rating 1–5)
-    chart_feedback_data = [rating_counts.get(i, 0) for i in range(1, 6)]
+    chart_feedback_data = summary['ratings']
     
-    # Dummy data chart user (contoh)
-    chart_user_labels = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
-    chart_user_data = [2, 5, 3, 8, 12, 15, 20] 
+    # Chart user 7 hari terakhir (7 dokumen rollup harian)
+    days, daily = rollups.daily(events=('signups', 'logins'), days=7)
+    chart_user_labels = [d.strftime("%d %b") for d in days]
+
+    # Chart aktivitas 24 jam terakhir (maks. 2 dokumen rollup harian)
+    hours, hourly = rollups.hourly(events=('analyses', 'edits', 'feedbacks'), hours=24)
+    chart_activity_labels = [h.strftime("%H:00") for h in hours]
 
     # Render dashboard dengan data
     return render_template(
         'dashboard.html', 
         current_user=current_user,
-        t_users=total_users, 
-        t_styles=total_styles, 
-        t_feedbacks=total_feedbacks,
-        avg_rating=avg_rating,
+        t_users=summary['users'], 
+        t_styles=summary['styles'], 
+        t_feedbacks=summary['feedbacks'],
+        avg_rating=summary['avg_rating'],
         c_feed_data=chart_feedback_data,
         c_user_labels=chart_user_labels,
-        c_user_data=chart_user_data
+        c_user_data=daily['signups'],
+        c_login_data=daily['logins'],
+        c_activity_labels=chart_activity_labels,
+        c_activity=hourly
     )
 
 
+# =========================================================
+# PAGINASI DAFTAR ADMIN (cursor + search + filter + sort)
+# =========================================================
+# Query hanya mengambil field yang ditampilkan tabel (tanpa foto base64);
+# foto dimuat terpisah lewat endpoint /photo per baris.
+
+FEEDBACK_FIELDS = ['user_email', 'user_name', 'rating', 'message', 'created_at', 'status']
+FEEDBACK_SORTS = {
+    "newest": ('created_at', firestore.Query.DESCENDING),
+    "oldest": ('created_at', firestore.Query.ASCENDING),
+    "rating_high": ('rating', firestore.Query.DESCENDING),
+    "rating_low": ('rating', firestore.Query.ASCENDING),
+}
+
+USER_FIELDS = ['full_name', 'email', 'role', 'is_online', 'created_at']
+USER_SORTS = {
+    "email": ('email', firestore.Query.ASCENDING),
+    "name": ('full_name', firestore.Query.ASCENDING),
+    "newest": ('created_at', firestore.Query.DESCENDING),
+    "oldest": ('created_at', firestore.Query.ASCENDING),
+}
+
+# Karakter unicode tertinggi → batas atas pencarian prefix
+PREFIX_END = '\uf8ff'
+
+
+def list_page(collection, fields, sorts, default_sort, search_field, filters=None):
+    """
+    Satu halaman daftar admin dari query string (?q=&sort=&cursor=&limit=).
+    Pencarian = prefix `search_field` (Firestore tidak punya full-text), dan
+    karena range query harus diurutkan pada field yang sama, sort diabaikan
+    selama ada kata kunci.
+    Return (docs, next_cursor, args yang dipakai untuk link halaman).
+    """
+    q = request.args.get('q', '').strip()
+    sort = request.args.get('sort', default_sort)
+    if sort not in sorts:
+        sort = default_sort
+    limit = clamp_limit(request.args.get('limit'), Config.ADMIN_PAGE_SIZE, Config.ADMIN_PAGE_MAX)
+
+    query = db.collection(collection).select(fields)
+    for field, value in (filters or {}).items():
+        query = query.where(field, '==', value)
+
+    if q:
+        order_field = search_field
+        query = query.where(search_field, '>=', q) \
+                     .where(search_field, '<=', q + PREFIX_END) \
+                     .order_by(search_field)
+    else:
+        order_field, direction = sorts[sort]
+        query = query.order_by(order_field, direction=direction)
+
+    cursor_doc = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        cursor_doc = db.collection(collection).document(cursor).get(field_paths=[order_field])
+        if not cursor_doc.exists:
+            cursor_doc = None
+
+    docs, next_cursor = fetch_page(query, limit, cursor_doc)
+    return docs, next_cursor, {"q": q, "sort": sort, "limit": limit}
+
+
 # =========================================================
 # 3. LIST FEEDBACK
 # =========================================================
 @admin_bp.route('/feedbacks')
 @login_required
 def feedback_list():
+    # Filter status read/unread (kosong = semua)
+    status = request.args.get('status', '')
+    filters = {"status": status} if status in ('read', 'unread') else {}
 
-    # Ambil feedback dengan urutan terbaru
-    docs = db.collection('feedbacks') \
-             .order_by('created_at', direction=firestore.Query.DESCENDING) \
-             .stream()
+    # Ambil satu halaman feedback (default: terbaru)
+    docs, next_cursor, args = list_page(
+        'feedbacks', FEEDBACK_FIELDS, FEEDBACK_SORTS, 'newest', 'user_email', filters
+    )
+    args['status'] = filters.get('status', '')
     
     feedbacks_data = []
 
-    # Loop semua feedback
+    # Loop feedback di halaman ini
     for doc in docs:
         d = doc.to_dict()
 
@@ -177,10 +236,35 @@ def feedback_list():
         else:
             d['date_str'] = "-"
 
+        # Rating bisa tersimpan sebagai string / kosong
+        d['rating'] = parse_rating(d.get('rating')) or 0
+
         feedbacks_data.append(d)
 
     # Render halaman feedback
-    return render_template('feedbacks.html', feedbacks=feedbacks_data)
+    return render_template(
+        'feedbacks.html', feedbacks=feedbacks_data, next_cursor=next_cursor,
+        args=args, sorts=FEEDBACK_SORTS
+    )
+
+
+@admin_bp.route('/feedback/<id>/photo')
+@login_required
+def feedback_photo(id):
+    doc = db.collection('feedbacks').document(id).get(field_paths=['user_photo'])
+    return photo_response(doc.to_dict().get('user_photo') if doc.exists else None)
+
+
+@admin_bp.route('/feedback/read/<id>')
+@login_required
+def mark_feedback_read(id):
+    try:
+        db.collection('feedbacks').document(id).update({"status": "read"})
+    except Exception as e:
+        flash(f'Gagal menandai feedback: {e}', 'danger')
+
+    # Kembali ke halaman (filter/cursor) sebelumnya
+    return redirect(request.referrer or url_for('admin_bp.feedback_list'))
 
 
 # =========================================================
@@ -189,11 +273,11 @@ def feedback_list():
 @admin_bp.route('/users')
 @login_required
 def user_list():
-    # Ambil semua user
-    users_ref = db.collection('users').stream()
+    # Ambil satu halaman user (default: urut email); cari = prefix email
+    docs, next_cursor, args = list_page('users', USER_FIELDS, USER_SORTS, 'email', 'email')
     users_data = []
     
-    for doc in users_ref:
+    for doc in docs:
         d = doc.to_dict()
 
         # Simpan UID dokumen
@@ -208,7 +292,28 @@ def user_list():
         users_data.append(d)
 
     # Render halaman users
-    return render_template('users.html', users=users_data)
+    return render_template(
+        'users.html', users=users_data, next_cursor=next_cursor,
+        args=args, sorts=USER_SORTS
+    )
+
+
+@admin_bp.route('/user/<uid>/photo')
+@login_required
+def user_photo(uid):
+    doc = db.collection('users').document(uid).get(field_paths=['profile_image_url'])
+    return photo_response(doc.to_dict().get('profile_image_url') if doc.exists else None)
+
+
+def photo_response(photo):
+    """Foto profil: data URI → bytes gambar, URL → redirect, kosong → placeholder."""
+    if photo and photo.startswith('data:'):
+        header, _, payload = photo.partition(',')
+        fmt = "webp" if "image/webp" in header else "jpeg"
+        return image_response(
+            base64.b64decode(payload), fmt, headers={"Cache-Control": "private, max-age=300"}
+        )
+    return redirect(photo or PLACEHOLDER_PHOTO)
 
 
 # =========================================================
@@ -218,8 +323,8 @@ def user_list():
 @login_required
 def delete_feedback(id):
     try:
-        # Hapus feedback berdasarkan ID
-        db.collection('feedbacks').document(id).delete()
+        # Hapus feedback berdasarkan ID (+ turunkan counter rating)
+        aggregates.delete('feedbacks', db.collection('feedbacks').document(id))
         flash('Feedback berhasil dihapus.', 'success')
     except Exception as e:
         flash(f'Gagal menghapus: {e}', 'danger')
@@ -240,8 +345,9 @@ def delete_user(uid):
         return redirect(url_for('admin_bp.user_list'))
 
     try:
-        # Hapus user dari Firestore
-        db.collection('users').document(uid).delete()
+        # Hapus user dari Firestore (+ turunkan counter user)
+        aggregates.delete('users', db.collection('users').document(uid))
+        user_cache.invalidate(uid)
         flash('User berhasil dihapus.', 'success')
     except Exception as e:
         flash(f'Gagal menghapus user: {e}', 'danger')
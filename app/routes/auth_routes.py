@@ -3,10 +3,13 @@
 # =========================
 
 import base64                      # Untuk encode gambar ke base64
-import cv2                         # OpenCV untuk manipulasi gambar
-import numpy as np                 # Numpy untuk manipulasi array
 from flask import Blueprint, request, jsonify  # Flask core
 from app.extensions import db, bcrypt           # Firestore DB & bcrypt
+from app.services.image_workers import image_workers, WorkerPoolSaturated  # Worker gambar
+from app.services.aggregates import aggregates  # Counter dashboard admin
+from app.services.rollups import rollups        # Rollup aktivitas harian/per jam
+from app.services.user_cache import user_cache  # Cache dokumen user
+from google.api_core.exceptions import AlreadyExists
 from flask_jwt_extended import (
     create_access_token,           # Membuat JWT token
     jwt_required,                  # Proteksi endpoint dengan JWT
@@ -65,8 +68,11 @@ def register():
             "updated_at": datetime.now()
         }
 
-        # Simpan user ke Firestore
-        user_doc_ref.set(new_user)
+        # Simpan user ke Firestore (+ counter user); gagal jika email keduluan didaftarkan
+        try:
+            aggregates.create('users', user_doc_ref, new_user, event='signups')
+        except AlreadyExists:
+            return jsonify({"message": "Email sudah terdaftar"}), 400
 
         # Response sukses
         return jsonify({"message": "Berhasil daftar", "email": email}), 201
@@ -87,7 +93,7 @@ def login():
         email = data.get('email')
         password = data.get('password')
 
-        # Ambil user dari Firestore
+        # Ambil user langsung dari Firestore (tanpa cache: hash password harus terbaru)
         user_doc = db.collection('users').document(email).get()
 
         # Jika user tidak ada
@@ -106,11 +112,15 @@ def login():
         if not bcrypt.check_password_hash(stored_hash, password):
             return jsonify({"message": "Password salah"}), 401
 
-        # Update status online & last login
-        db.collection('users').document(email).update({
+        # Update status online & last login (+ rollup 'logins' dalam satu batch)
+        batch = db.batch()
+        batch.update(db.collection('users').document(email), {
             "last_login": datetime.now(),
             "is_online": True
         })
+        rollups.stage(batch, 'logins')
+        batch.commit()
+        user_cache.invalidate(email)
 
         # Generate JWT token
         token = create_access_token(identity=email)
@@ -141,15 +151,13 @@ def get_profile():
         # Ambil email dari JWT
         email = get_jwt_identity()
 
-        # Ambil data user
-        user_doc = db.collection('users').document(email).get()
+        # Ambil data user (cache)
+        user_data = user_cache.get(email)
 
         # Jika user tidak ditemukan
-        if not user_doc.exists:
+        if user_data is None:
             return jsonify({"message": "User tidak ditemukan"}), 404
 
-        user_data = user_doc.to_dict()
-
         # Hapus password hash agar aman
         user_data.pop('password_hash', None)
 
@@ -210,6 +218,7 @@ def update_profile():
 
             db.collection('users').document(new_email).set(old_data)
             user_doc_ref.delete()
+            user_cache.invalidate(current_email, new_email)
 
             # Buat token baru
             new_token = create_access_token(identity=new_email)
@@ -222,6 +231,7 @@ def update_profile():
 
         # Update nama saja
         user_doc_ref.update(update_data)
+        user_cache.invalidate(current_email)
 
         return jsonify({"status": "success", "message": "Profil berhasil diperbarui"}), 200
 
@@ -246,8 +256,10 @@ def change_password():
         if not current_password or not new_password:
             return jsonify({"message": "Password lama & baru wajib diisi"}), 400
 
-        # Ambil data user
+        # Ambil user langsung dari Firestore (tanpa cache: hash password harus terbaru)
         user_doc = db.collection('users').document(email).get()
+        if not user_doc.exists:
+            return jsonify({"message": "User tidak ditemukan"}), 404
         user_data = user_doc.to_dict()
 
         # Verifikasi password lama
@@ -259,6 +271,7 @@ def change_password():
             "password_hash": bcrypt.generate_password_hash(new_password).decode('utf-8'),
             "updated_at": datetime.now()
         })
+        user_cache.invalidate(email)
 
         return jsonify({"status": "success", "message": "Password berhasil diubah"}), 200
 
@@ -281,30 +294,12 @@ def upload_photo():
 
         file = request.files['image']
 
-        # Convert file ke numpy array
-        file_bytes = np.frombuffer(file.read(), np.uint8)
+        # Decode, resize (maks 512px) & kompres JPG kualitas 70% di worker gambar
+        buffer = image_workers.run('thumbnail', file.read(), max_dim=512, quality=70)
 
-        # Decode menjadi gambar
-        img = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-
-        if img is None:
+        if buffer is None:
             return jsonify({"message": "File bukan gambar"}), 400
 
-        # Resize gambar jika terlalu besar
-        h, w = img.shape[:2]
-        max_dim = 512
-
-        if max(h, w) > max_dim:
-            scale = max_dim / max(h, w)
-            img = cv2.resize(
-                img,
-                (int(w * scale), int(h * scale)),
-                interpolation=cv2.INTER_AREA
-            )
-
-        # Kompres JPG kualitas 70%
-        _, buffer = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-
         # Encode base64
         img_base64 = base64.b64encode(buffer).decode('utf-8')
         profile_image_url = f"data:image/jpeg;base64,{img_base64}"
@@ -314,6 +309,7 @@ def upload_photo():
             "profile_image_url": profile_image_url,
             "updated_at": datetime.now()
         })
+        user_cache.invalidate(email)
 
         return jsonify({
             "status": "success",
@@ -321,6 +317,9 @@ def upload_photo():
             "image_url": profile_image_url
         }), 200
 
+    except WorkerPoolSaturated as e:
+        return jsonify({"message": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
     except Exception as e:
         return jsonify({"message": f"Gagal memproses gambar: {str(e)}"}), 500
 
@@ -338,6 +337,7 @@ def logout():
         db.collection('users').document(email).update({
             "is_online": False
         })
+        user_cache.invalidate(email)
 
         return jsonify({"status": "success", "message": "Logout berhasil"}), 200
 
@@ -384,13 +384,18 @@ def google_login():
                 "updated_at": datetime.now(),
                 "login_method": "GOOGLE"
             }
-            user_doc_ref.set(new_user)
+            aggregates.create('users', user_doc_ref, new_user, event='signups')
+            rollups.record('logins')
         else:
-            # Update status login
-            user_doc_ref.update({
+            # Update status login (+ rollup 'logins' dalam satu batch)
+            batch = db.batch()
+            batch.update(user_doc_ref, {
                 "is_online": True,
                 "last_login": datetime.now()
             })
+            rollups.stage(batch, 'logins')
+            batch.commit()
+        user_cache.invalidate(email)
 
         # Generate JWT
         app_token = create_access_token(identity=email)
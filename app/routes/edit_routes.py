@@ -1,39 +1,72 @@
+import base64
+import json
+import time
 from flask import Blueprint, request, jsonify
-from app.services.edit_service import EditService
+from app.services.edit_service import EDIT_TYPES
+from app.services.image_workers import image_workers, WorkerPoolSaturated
+from app.utils.image_io import negotiate_format, image_response
 
 # Membuat blueprint endpoint khusus edit gambar
 edit_api = Blueprint('edit_api', __name__)
 
-# Instance service yang berisi fungsi manipulasi gambar
-service = EditService()
+
+def busy_response(e):
+    # Worker gambar penuh → minta client mencoba lagi
+    return jsonify({"status": "error", "message": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+
+def operations_error(operations):
+    """Pesan error jika daftar operasi edit tidak valid, atau None jika valid."""
+    if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+        return "Operasi edit harus berupa list objek"
+    invalid = [op.get('type') or op.get('edit_type') for op in operations
+               if (op.get('type') or op.get('edit_type')) not in EDIT_TYPES]
+    if invalid:
+        return f"Operasi tidak dikenal: {invalid}"
+    return None
+
 
 @edit_api.route('/edit-style', methods=['POST'])
 def edit_style():
     try:
         # Ambil JSON yang dikirim dari frontend
-        data = request.json
-        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"status": "error", "message": "Body harus berupa JSON"}), 400
+
         # Base64 dari gambar asli sebelum di-edit
         img_base64 = data.get('image_base64')
 
-        # Jenis editnya: 'color', 'hair', 'glasses', 'hijab'
-        edit_type = data.get('edit_type')
+        # Daftar edit berurutan, contoh:
+        # [{"edit_type": "color", "value": "#8B4513"}, {"edit_type": "glasses", "value": "g1"}]
+        edits = data.get('edits')
 
-        # Value tambahan: bisa hex (untuk warna) atau nama file asset (untuk overlay)
-        value = data.get('value')
+        if not edits:
+            # Format lama: satu edit per request
+            # Jenis editnya: 'color', 'hair', 'glasses', 'hijab'
+            # Value tambahan: bisa hex (untuk warna) atau nama file asset (untuk overlay)
+            edits = [{"edit_type": data.get('edit_type'), "value": data.get('value')}]
 
-        # Decode Base64 → format gambar numpy
-        img = service.decode_image(img_base64)
-        
-        # Jika user mengubah warna rambut
-        if edit_type == 'color':
-            result_img = service.apply_hair_color(img, value)
-        else:
-            # Jika pakai asset PNG (kacamata, rambut, hijab, dsb)
-            result_img = service.apply_overlay(img, edit_type, value)
+        if not img_base64:
+            return jsonify({"status": "error", "message": "image_base64 wajib diisi"}), 400
+
+        error = operations_error(edits)
+        if error:
+            return jsonify({"status": "error", "message": error}), 400
+
+        try:
+            img_bytes = base64.b64decode(img_base64)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "image_base64 tidak valid"}), 400
+
+        # Decode, edit & encode dijalankan di worker gambar
+        # (semua edit memakai satu hasil face mesh & segmentasi yang sama)
+        result_jpg, _ = image_workers.run('edit_pipeline', img_bytes, operations=edits)
+        if result_jpg is None:
+            return jsonify({"status": "error", "message": "Gambar tidak valid"}), 400
 
         # Encode kembali ke Base64 untuk dikirim kembali ke frontend
-        result_base64 = service.encode_image(result_img)
+        result_base64 = base64.b64encode(result_jpg).decode('utf-8')
         
         # Response sukses
         return jsonify({
@@ -41,6 +74,111 @@ def edit_style():
             "image_result": result_base64
         })
 
+    except WorkerPoolSaturated as e:
+        return busy_response(e)
+
     except Exception as e:
         # Jika ada error sistem/backend
         return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@edit_api.route('/pipeline', methods=['POST'])
+def edit_pipeline():
+    try:
+        total_start = time.perf_counter()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"status": "error", "message": "Body harus berupa JSON"}), 400
+
+        img_base64 = data.get('image_base64')
+
+        # Daftar operasi berurutan, contoh:
+        # [{"type": "color", "value": "#8B4513"}, {"type": "hair", "value": "male/m1"},
+        #  {"type": "glasses", "value": "g2"}]
+        operations = data.get('operations') or []
+
+        if not img_base64 or not operations:
+            return jsonify({"status": "error", "message": "image_base64 dan operations wajib diisi"}), 400
+
+        error = operations_error(operations)
+        if error:
+            return jsonify({"status": "error", "message": error}), 400
+
+        try:
+            img_bytes = base64.b64decode(img_base64)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "image_base64 tidak valid"}), 400
+
+        # Decode sekali, semua operasi in-memory, encode sekali (di worker gambar)
+        result_jpg, timings = image_workers.run('edit_pipeline', img_bytes, operations=operations)
+        if result_jpg is None:
+            return jsonify({"status": "error", "message": "Gambar tidak valid"}), 400
+
+        result_base64 = base64.b64encode(result_jpg).decode('utf-8')
+        timings["total_ms"] = round((time.perf_counter() - total_start) * 1000, 2)
+
+        return jsonify({
+            "status": "success",
+            "image_result": result_base64,
+            "timings": timings
+        })
+
+    except WorkerPoolSaturated as e:
+        return busy_response(e)
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@edit_api.route('/render', methods=['POST'])
+def edit_render():
+    """
+    Versi biner dari /pipeline: multipart `image` + field `operations` (JSON),
+    balasan langsung image/jpeg atau image/webp (tanpa base64).
+    Endpoint JSON di atas tetap ada untuk kompatibilitas client lama.
+    """
+    try:
+        total_start = time.perf_counter()
+
+        if 'image' not in request.files:
+            return jsonify({"status": "error", "message": "File gambar tidak ditemukan"}), 400
+
+        operations = request.form.get('operations')
+        if operations:
+            try:
+                operations = json.loads(operations)
+            except ValueError:
+                return jsonify({"status": "error", "message": "operations harus berupa JSON"}), 400
+        else:
+            # Format lama: satu edit lewat field edit_type & value
+            operations = [{"type": request.form.get('edit_type'), "value": request.form.get('value')}]
+
+        error = operations_error(operations)
+        if error:
+            return jsonify({"status": "error", "message": error}), 400
+
+        fmt = negotiate_format(request)
+        try:
+            quality = max(1, min(int(request.form.get('quality', 90)), 100))
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "quality harus angka 1-100"}), 400
+
+        # Stream upload dibaca langsung ke buffer worker → decode → edit → encode
+        result, timings = image_workers.run_upload(
+            'edit_pipeline', request.files['image'],
+            operations=operations, quality=quality, fmt=fmt
+        )
+        if result is None:
+            return jsonify({"status": "error", "message": "Gambar tidak valid"}), 400
+
+        total_ms = round((time.perf_counter() - total_start) * 1000, 2)
+        server_timing = (
+            f"decode;dur={timings['decode_ms']}, encode;dur={timings['encode_ms']}, total;dur={total_ms}"
+        )
+        return image_response(result, fmt, headers={"Server-Timing": server_timing})
+
+    except WorkerPoolSaturated as e:
+        return busy_response(e)
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from app.extensions import db
+from app.services.aggregates import aggregates
+from app.services.user_cache import user_cache
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 
@@ -13,8 +14,7 @@ def submit_feedback():
         current_email = get_jwt_identity()
         
         # 2. Ambil data lengkap user dari Firestore (untuk kelengkapan data feedback)
-        user_doc = db.collection('users').document(current_email).get()
-        user_data = user_doc.to_dict() if user_doc.exists else {}
+        user_data = user_cache.get(current_email) or {}
 
         # 3. Ambil Input dari Flutter
         data = request.get_json()
@@ -35,8 +35,8 @@ def submit_feedback():
             "status": "unread" # Status untuk Admin (unread/read)
         }
 
-        # 5. Simpan ke Collection 'feedbacks'
-        db.collection('feedbacks').add(new_feedback)
+        # 5. Simpan ke Collection 'feedbacks' (+ counter, histogram rating & rollup harian)
+        aggregates.add('feedbacks', new_feedback, event='feedbacks')
 
         return jsonify({"status": "success", "message": "Feedback berhasil dikirim"}), 201
 
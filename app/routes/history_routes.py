@@ -1,8 +1,14 @@
 import base64
-import cv2
-import numpy as np
 from flask import Blueprint, request, jsonify
 from app.extensions import db
+from config import Config
+from app.services.image_workers import WorkerPoolSaturated
+from app.services.blob_store import blob_store
+from app.services.aggregates import aggregates
+from app.services.history_images import store_history_images, delete_history_images, with_image_urls
+from app.services.history_cleanup import history_clear
+from app.utils.image_io import image_response
+from app.utils.pagination import clamp_limit, fetch_page
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 
@@ -32,44 +38,26 @@ def add_history():
         face_shape = request.form.get('face_shape', 'Unknown') # ✅ Tangkap Face Shape
         gender = request.form.get('gender', 'Unknown')         # ✅ Tangkap Gender
         
-        # Konversi file → numpy array
-        file_bytes = np.frombuffer(file.read(), np.uint8)
-        img = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+        # Resize (maks 512px) + thumbnail di worker gambar, lalu upload ke blob storage
+        keys, _ = store_history_images(file.read(), max_dim=512, quality=70)
 
         # Validasi file
-        if img is None:
+        if keys is None:
             return jsonify({"status": "error", "message": "File rusak atau bukan gambar"}), 400
 
-        # Resize gambar agar tidak terlalu besar saat disimpan
-        h, w = img.shape[:2]
-        max_dim = 512
-        if max(h, w) > max_dim:
-            scale = max_dim / max(h, w)
-            new_w, new_h = int(w * scale), int(h * scale)
-            img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
-
-        # Kompres ke format JPG (Quality 70)
-        _, buffer = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-        
-        # Encode → Base64 → string
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
-        
-        # Format Base64 lengkap dengan header (sesuai kode lama Anda)
-        final_image_string = f"data:image/jpeg;base64,{img_base64}"
-
-        # Buat objek yang disimpan di Firestore
+        # Buat objek yang disimpan di Firestore (gambar cukup key-nya saja)
         new_history = {
             "userId": email,                
             "style_name": style_name,       
             "face_shape": face_shape,       # ✅ Simpan ke Database
             "gender": gender,               # ✅ Simpan ke Database
-            "result_image_url": final_image_string,  
+            **keys,                         # image_key & thumb_key
             "timestamp": datetime.now(),    
             "is_favorite": False            
         }
 
-        # Insert ke collection Firestore (style_history)
-        db.collection('style_history').add(new_history)
+        # Insert ke collection Firestore (style_history) + counter & rollup 'edits'
+        aggregates.add('styles', new_history, event='edits')
 
         print(f"[HISTORY] Berhasil simpan history untuk {email} | Shape: {face_shape}")
         return jsonify({
@@ -77,27 +65,61 @@ def add_history():
             "message": "History berhasil disimpan"
         }), 201
 
+    except WorkerPoolSaturated as e:
+        return jsonify({"status": "error", "message": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
     except Exception as e:
         print(f"[HISTORY ERROR] {e}")
         return jsonify({"status": "error", "message": f"Server Error: {str(e)}"}), 500
 
 
 # ============================================================
-# 2. GET ALL HISTORY LIST BY USER (GET) - TETAP SAMA
+# 2. GET HISTORY LIST BY USER (GET) - PAGINASI CURSOR
 # ============================================================
+# Field yang dikirim di tampilan list (tanpa payload gambar inline)
+LIST_FIELDS = (
+    'style_name', 'face_shape', 'gender', 'confidence', 'recommendations',
+    'timestamp', 'is_favorite', 'image_key', 'thumb_key'
+)
+
+
 @history_bp.route('', methods=['GET'])
 @history_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_history():
+    """
+    Query: ?limit=20&cursor=<id history terakhir>&fields=style_name,timestamp
+    Return halaman berikutnya + `next_cursor` (null jika sudah habis).
+    Mendukung If-None-Match → 304 jika isi halaman tidak berubah.
+    """
     try:
         email = get_jwt_identity()
 
-        # Query semua history milik user
-        docs = db.collection('style_history') \
-                 .where('userId', '==', email) \
-                 .order_by('timestamp', direction='DESCENDING') \
-                 .get()
-        
+        limit = clamp_limit(request.args.get('limit'), Config.HISTORY_PAGE_SIZE, Config.HISTORY_PAGE_MAX)
+
+        fields = LIST_FIELDS
+        if request.args.get('fields'):
+            fields = tuple(f for f in request.args['fields'].split(',') if f in LIST_FIELDS)
+            if not fields:
+                return jsonify({"status": "error", "message": "fields tidak valid"}), 400
+
+        # Projection: hanya field list yang diambil dari Firestore
+        query = db.collection('style_history') \
+                  .where('userId', '==', email) \
+                  .order_by('timestamp', direction='DESCENDING') \
+                  .select(list(fields))
+
+        cursor_doc = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            cursor_doc = db.collection('style_history').document(cursor).get(
+                field_paths=['userId', 'timestamp']
+            )
+            if not cursor_doc.exists or cursor_doc.get('userId') != email:
+                return jsonify({"status": "error", "message": "cursor tidak valid"}), 400
+
+        docs, next_cursor = fetch_page(query, limit, cursor_doc)
+
         history_list = []
 
         # Loop dan ubah ke JSON
@@ -109,13 +131,19 @@ def get_history():
                 data['timestamp'] = data['timestamp'].isoformat()
 
             data['id'] = doc.id  # tambahkan documentId
-            history_list.append(data)
+            history_list.append(with_image_urls(doc.id, data))
         
-        return jsonify({
+        response = jsonify({
             "status": "success",
             "count": len(history_list),
-            "data": history_list
-        }), 200
+            "data": history_list,
+            "next_cursor": next_cursor
+        })
+
+        # ETag dari isi halaman; client cukup revalidasi (304 tanpa body)
+        response.add_etag()
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -146,7 +174,58 @@ def get_history_detail(history_id):
 
         data['id'] = doc.id
         
-        return jsonify({"status": "success", "data": data}), 200
+        return jsonify({"status": "success", "data": with_image_urls(doc.id, data)}), 200
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# ============================================================
+# 3b. GAMBAR HISTORY SEBAGAI image/jpeg BINER (GET, lazy)
+# ============================================================
+@history_bp.route('/<history_id>/image', methods=['GET'])
+@jwt_required()
+def get_history_image(history_id):
+    return send_history_image(history_id, 'image_key')
+
+
+@history_bp.route('/<history_id>/thumbnail', methods=['GET'])
+@jwt_required()
+def get_history_thumbnail(history_id):
+    return send_history_image(history_id, 'thumb_key')
+
+
+def send_history_image(history_id, key_field):
+    try:
+        email = get_jwt_identity()
+
+        doc = db.collection('style_history').document(history_id).get(
+            field_paths=['userId', key_field, 'result_image_url', 'photo_base64']
+        )
+
+        if not doc.exists:
+            return jsonify({"status": "error", "message": "History tidak ditemukan"}), 404
+
+        data = doc.to_dict()
+        if data.get('userId') != email:
+            return jsonify({"status": "error", "message": "Unauthorized"}), 403
+
+        # Key blob tidak pernah berubah isi → boleh di-cache lama oleh client
+        headers = {"Cache-Control": "private, max-age=31536000, immutable"}
+        if data.get(key_field):
+            content = blob_store.get(data[key_field])
+            if content is None:
+                return jsonify({"status": "error", "message": "Gambar tidak ditemukan"}), 404
+            return image_response(content, "jpeg", headers=headers)
+
+        # Dokumen lama (belum dimigrasi): data URI inline → bytes JPEG
+        image = data.get('result_image_url') or data.get('photo_base64') or ''
+        if not image:
+            return jsonify({"status": "error", "message": "History tidak memiliki gambar"}), 404
+        if ',' in image:
+            image = image.split(',', 1)[1]
+
+        return image_response(base64.b64decode(image), "jpeg")
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -167,10 +246,12 @@ def delete_history(history_id):
         if not doc.exists:
             return jsonify({"status": "error", "message": "History tidak ditemukan"}), 404
         
-        if doc.to_dict().get('userId') != email:
+        data = doc.to_dict()
+        if data.get('userId') != email:
             return jsonify({"status": "error", "message": "Unauthorized"}), 403
         
-        doc_ref.delete()
+        aggregates.delete('styles', doc_ref)
+        delete_history_images(data)
 
         return jsonify({"status": "success", "message": "History berhasil dihapus"}), 200
 
@@ -179,20 +260,24 @@ def delete_history(history_id):
 
 
 # ============================================================
-# 5. DELETE SEMUA HISTORY MILIK USER (DELETE) - TETAP SAMA
+# 5. DELETE SEMUA HISTORY MILIK USER (DELETE) - MASSAL
 # ============================================================
+# ?async=1 → dijalankan di background, return 202 + URL status job
 @history_bp.route('/clear', methods=['DELETE'])
 @jwt_required()
 def clear_all_history():
     try:
         email = get_jwt_identity()
 
-        docs = db.collection('style_history').where('userId', '==', email).get()
-        
-        deleted_count = 0
-        for doc in docs:
-            doc.reference.delete()
-            deleted_count += 1
+        if request.args.get('async') in ('1', 'true'):
+            job = history_clear.submit(email)
+            return jsonify({
+                "status": "accepted",
+                "job_id": job["id"],
+                "status_url": f"/api/history/clear/jobs/{job['id']}"
+            }), 202
+
+        deleted_count = history_clear.clear(email)
         
         return jsonify({
             "status": "success",
@@ -203,6 +288,23 @@ def clear_all_history():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@history_bp.route('/clear/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_clear_job(job_id):
+    job = history_clear.get(job_id)
+    if job is None or job["user_id"] != get_jwt_identity():
+        return jsonify({"status": "error", "message": "Job tidak ditemukan"}), 404
+
+    return jsonify({
+        "status": "success",
+        "job_id": job["id"],
+        "state": job["state"],
+        "deleted": job["deleted"],
+        "total": job["total"],
+        "error": job["error"]
+    }), 200
+
+
 # ============================================================
 # 6. UPDATE HISTORY (PUT) - TETAP SAMA
 # ============================================================
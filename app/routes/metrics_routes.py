@@ -0,0 +1,26 @@
+from flask import Blueprint, jsonify
+from app.services.ai_service import ai_service
+from app.services.asset_registry import asset_registry
+from app.services.edit_service import edit_service
+from app.services.image_workers import image_workers
+from app.services.lightx_jobs import lightx_jobs
+from app.services.user_cache import user_cache
+
+# Blueprint untuk memantau performa service (prefix /api/metrics)
+metrics_bp = Blueprint('metrics_api', __name__, url_prefix='/api/metrics')
+
+
+@metrics_bp.route('', methods=['GET'])
+@metrics_bp.route('/', methods=['GET'])
+def get_metrics():
+    return jsonify({
+        "status": "success",
+        "data": {
+            "ai": ai_service.stats(),
+            "assets": asset_registry.stats(),
+            "edit": edit_service.stats(),
+            "image_workers": image_workers.stats(),
+            "lightx": lightx_jobs.stats(),
+            "user_cache": user_cache.stats()
+        }
+    }), 200
@@ -2,31 +2,29 @@ import os
 import requests
 import datetime
 import base64
-import cv2
 import uuid
-import numpy as np
 import traceback
 import json
 import time
-from flask import Blueprint, request, jsonify, current_app
-from app.extensions import db
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from app.extensions import db, socketio
+from config import Config
 from app.services.ai_service import ai_service
+from app.services.aggregates import aggregates
+from app.services.analysis_cache import content_hash
+from app.services.blob_store import blob_store
+from app.services.image_workers import WorkerPoolSaturated
+from app.services.history_images import store_history_images
+from app.services.lightx_jobs import lightx_jobs, job_store, to_data_uri
+from app.services.job_store import FINAL_STATES
+from app.utils.image_io import image_response
+from app.utils.cache import TTLCache
 from firebase_admin import firestore
 
 style_bp = Blueprint('style_api', __name__, url_prefix='/api/style')
 
 # ==============================================================================
-# 1. KONFIGURASI API KEY (LIGHTX V2)
-# ==============================================================================
-LIGHTX_API_KEY = "d9b68e13818e4b199384f83347223938cb5d8d7fd80e405aab5d993467d1e81a_andoraitools"
-
-# LightX API v2 Endpoints
-UPLOAD_URL = "https://api.lightxeditor.com/external/api/v2/uploadImageUrl"
-HAIRSTYLE_URL = "https://api.lightxeditor.com/external/api/v2/hairstyle"
-STATUS_URL = "https://api.lightxeditor.com/external/api/v2/order-status"
-
-# ==============================================================================
-# 2. KAMUS STYLE (PROMPT ENGINEERING)
+# 1. KAMUS STYLE (PROMPT ENGINEERING)
 # ==============================================================================
 STYLES_DB = {
     # --- PRIA ---
@@ -62,234 +60,99 @@ STYLES_DB = {
     "brown": "Chestnut brown hair color"
 }
 
-# ==============================================================================
-# 3. HELPER: LIGHTX V2 - UPLOAD IMAGE
-# ==============================================================================
-def upload_image_to_lightx(image_bytes):
-    """
-    Step 1: Upload image ke LightX S3, dapat imageUrl
-    """
-    try:
-        # Get image size
-        image_size = len(image_bytes)
-        
-        print(f">>> [STEP 1] Uploading image to LightX ({image_size} bytes)...")
-        
-        # Request uploadUrl
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": LIGHTX_API_KEY
-        }
-        
-        payload = {
-            "uploadType": "imageUrl",
-            "size": image_size,
-            "contentType": "image/jpeg"
-        }
-        
-        response = requests.post(UPLOAD_URL, headers=headers, json=payload, timeout=30)
-        
-        if response.status_code != 200:
-            print(f"❌ Upload request failed: {response.text}")
-            return None
-        
-        data = response.json()
-        
-        if data.get('statusCode') != 2000:
-            print(f"❌ LightX error: {data.get('message')}")
-            return None
-        
-        upload_url = data['body']['uploadImage']
-        image_url = data['body']['imageUrl']
-        
-        print(f">>> [STEP 1.1] Uploading to S3: {upload_url[:80]}...")
-        
-        # Upload image to S3 using PUT
-        put_headers = {"Content-Type": "image/jpeg"}
-        put_response = requests.put(upload_url, headers=put_headers, data=image_bytes, timeout=60)
-        
-        if put_response.status_code != 200:
-            print(f"❌ S3 upload failed: {put_response.status_code}")
-            return None
-        
-        print(f"✅ Image uploaded! URL: {image_url}")
-        return image_url
-        
-    except Exception as e:
-        print(f"❌ Exception during upload: {e}")
-        traceback.print_exc()
-        return None
+# Kategori prompt (dipakai untuk statistik waktu selesai order LightX)
+STYLE_CATEGORIES = {
+    "hair": ["side_swept", "quiff_grey", "wolf_cut", "side_part",
+             "layered", "messy_bun", "wavy_blonde", "straight"],
+    "glasses": ["wayfarer", "round", "aviator", "sporty"],
+    "hijab": ["black_basic", "navy_shawl", "cream", "pink"],
+    "color": ["silver", "blonde", "red", "blue", "black", "brown"]
+}
+STYLE_CATEGORY_OF = {key: cat for cat, keys in STYLE_CATEGORIES.items() for key in keys}
 
 # ==============================================================================
-# 4. HELPER: LIGHTX V2 - GENERATE HAIRSTYLE
+# 2. ENDPOINT: EDIT STYLE (UPDATED FOR V2)
 # ==============================================================================
-def generate_hairstyle(image_url, text_prompt):
+def parse_style_request(data):
     """
-    Step 2: Generate hairstyle, dapat orderId
+    Ambil (image_bytes, final_prompt, ui_value, category) dari body JSON,
+    atau None jika tidak lengkap.
     """
-    try:
-        print(f">>> [STEP 2] Generating hairstyle...")
-        print(f">>> Prompt: {text_prompt}")
-        
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": LIGHTX_API_KEY
-        }
-        
-        payload = {
-            "imageUrl": image_url,
-            "textPrompt": text_prompt
-        }
-        
-        response = requests.post(HAIRSTYLE_URL, headers=headers, json=payload, timeout=30)
-        
-        if response.status_code != 200:
-            print(f"❌ Hairstyle request failed: {response.text}")
-            return None
-        
-        data = response.json()
-        
-        if data.get('statusCode') != 2000:
-            print(f"❌ LightX error: {data.get('message')}")
-            return None
-        
-        order_id = data['body']['orderId']
-        print(f"✅ Order created: {order_id}")
-        
-        return order_id
-        
-    except Exception as e:
-        print(f"❌ Exception during generation: {e}")
-        traceback.print_exc()
-        return None
+    original_base64 = data.get('image_base64')
+    ui_value = data.get('value') 
+    if not ui_value:
+        ui_value = data.get('style_name')
 
-# ==============================================================================
-# 5. HELPER: LIGHTX V2 - CHECK STATUS
-# ==============================================================================
-def check_order_status(order_id, max_retries=5):
-    """
-    Step 3: Check status berkala sampai 'active'
-    """
-    try:
-        print(f">>> [STEP 3] Checking order status...")
-        
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": LIGHTX_API_KEY
-        }
-        
-        payload = {"orderId": order_id}
-        
-        for attempt in range(max_retries):
-            print(f">>> Retry {attempt + 1}/{max_retries}...")
-            
-            response = requests.post(STATUS_URL, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code != 200:
-                print(f"⚠️ Status check failed: {response.text}")
-                time.sleep(3)
-                continue
-            
-            data = response.json()
-            
-            if data.get('statusCode') != 2000:
-                print(f"⚠️ Error: {data.get('message')}")
-                time.sleep(3)
-                continue
-            
-            status = data['body']['status']
-            print(f">>> Status: {status}")
-            
-            if status == 'active':
-                output_url = data['body']['output']
-                print(f"✅ Generation complete! URL: {output_url}")
-                return output_url
-            elif status == 'failed':
-                print(f"❌ Generation failed")
-                return None
-            
-            # Status masih 'init', tunggu 3 detik
-            time.sleep(3)
-        
-        print(f"❌ Timeout after {max_retries} retries")
-        return None
-        
-    except Exception as e:
-        print(f"❌ Exception during status check: {e}")
-        traceback.print_exc()
+    if not original_base64 or not ui_value:
         return None
 
-# ==============================================================================
-# 6. ENDPOINT: EDIT STYLE (UPDATED FOR V2)
-# ==============================================================================
+    # Decode Base64 ke bytes
+    if "," in original_base64:
+        original_base64 = original_base64.split(",")[1]
+    
+    image_bytes = base64.b64decode(original_base64)
+    final_prompt, category = build_prompt(ui_value)
+    return image_bytes, final_prompt, ui_value, category
+
+
+def build_prompt(ui_value):
+    """Nama style dari UI → (prompt final LightX, kategori)."""
+    # Normalisasi prompt
+    normalized_key = ui_value.lower().replace(" ", "_")
+    text_prompt = STYLES_DB.get(normalized_key, f"{ui_value} hairstyle")
+    final_prompt = f"{text_prompt}, photorealistic, 8k, highly detailed"
+    return final_prompt, STYLE_CATEGORY_OF.get(normalized_key, "custom")
+
+
+def job_pending_response(job):
+    """202 + URL status job saat endpoint blocking berhenti menunggu."""
+    status_url = f"{style_bp.url_prefix}/jobs/{job['id']}"
+    return jsonify({
+        "status": "pending",
+        "message": "Hasil belum siap, cek status job secara berkala",
+        "status_url": status_url,
+        "data": job_to_json(job)
+    }), 202, {"Location": status_url}
+
+
 @style_bp.route('/edit-style', methods=['POST'], strict_slashes=False)
 def edit_style():
+    """
+    Endpoint lama (blocking) untuk kompatibilitas: job dijalankan di background
+    runner, request ini hanya menunggu hasilnya tanpa ikut polling LightX.
+    Menunggu maksimal LIGHTX_SYNC_WAIT detik; setelah itu balas 202 + URL status.
+    """
     print(f"\n{'='*70}")
     print(f">>> [AI GEN] LightX API v2 - Edit Style Request")
     print(f"{'='*70}")
     
     try:
-        data = request.json
-        
-        original_base64 = data.get('image_base64')
-        ui_value = data.get('value') 
-        if not ui_value:
-            ui_value = data.get('style_name')
-
-        if not original_base64 or not ui_value:
+        parsed = parse_style_request(request.json)
+        if not parsed:
             return jsonify({
                 "status": "error", 
                 "message": "Data tidak lengkap (perlu image_base64 dan value)"
             }), 400
 
+        image_bytes, final_prompt, ui_value, category = parsed
         print(f">>> Received style value: {ui_value}")
 
-        # Decode Base64 ke bytes
-        if "," in original_base64:
-            original_base64 = original_base64.split(",")[1]
-        
-        image_bytes = base64.b64decode(original_base64)
-        
-        # Normalisasi prompt
-        normalized_key = ui_value.lower().replace(" ", "_")
-        text_prompt = STYLES_DB.get(normalized_key, f"{ui_value} hairstyle")
-        final_prompt = f"{text_prompt}, photorealistic, 8k, highly detailed"
-        
-        # === STEP 1: Upload Image ===
-        image_url = upload_image_to_lightx(image_bytes)
-        if not image_url:
-            return jsonify({
-                "status": "error", 
-                "message": "Gagal upload image ke LightX"
-            }), 500
-        
-        # === STEP 2: Generate Hairstyle ===
-        order_id = generate_hairstyle(image_url, final_prompt)
-        if not order_id:
-            return jsonify({
-                "status": "error", 
-                "message": "Gagal generate hairstyle"
-            }), 500
-        
-        # === STEP 3: Check Status (Polling) ===
-        output_url = check_order_status(order_id)
-        if not output_url:
+        job = lightx_jobs.submit(image_bytes, final_prompt, category=category, style=ui_value)
+        job = job_store.wait(job["id"], timeout=Config.LIGHTX_SYNC_WAIT)
+
+        if job and job["state"] not in FINAL_STATES:
+            return job_pending_response(job)
+        if not job or job["state"] != "done":
             return jsonify({
                 "status": "error", 
-                "message": "Gagal mendapatkan hasil (timeout atau failed)"
+                "message": (job or {}).get("error") or "Gagal mendapatkan hasil (timeout atau failed)"
             }), 500
         
-        # === Download Result & Convert to Base64 ===
-        print(f">>> Downloading result from: {output_url}")
-        result_response = requests.get(output_url, timeout=30)
-        result_b64 = base64.b64encode(result_response.content).decode('utf-8')
-        final_b64 = f"data:image/jpeg;base64,{result_b64}"
-        
         print(f"✅ SUCCESS! Hairstyle generation complete.")
         
         return jsonify({
             "status": "success", 
-            "image_result": final_b64,
+            "image_result": to_data_uri(job["result"]),
             "type": "base64",
             "message": "AI styling berhasil!"
         }), 200
@@ -304,8 +167,214 @@ def edit_style():
 
 
 # ==============================================================================
-# 7. ENDPOINT LAINNYA (ANALYZE & CHAT)
+# 3. ENDPOINT: JOB EDIT STYLE (ASYNC)
+# ==============================================================================
+# POST /api/style/jobs        → 202 + job_id (langsung, tanpa menunggu LightX)
+# GET  /api/style/jobs/<id>   → state: queued/uploading/generating/polling/done/failed
+# Socket.IO: emit 'subscribe_job' {"job_id": ...} → terima event 'style_job'
+def job_to_json(job):
+    data = {
+        "job_id": job["id"],
+        "state": job["state"],
+        "style": job.get("style"),
+        "cached": job.get("cached", False),
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+    if job["state"] == "done":
+        data["image_result"] = to_data_uri(job["result"])
+        # Versi biner (lebih ringan) untuk client baru
+        data["image_url"] = f"{style_bp.url_prefix}/jobs/{job['id']}/image"
+    return data
+
+
+def push_job_update(job):
+    data = job_to_json(job)
+    socketio.emit('style_job', data, room=f"job:{job['id']}")
+    # Job yang menjadi bagian batch juga dikirim ke room batch
+    for batch_id in job.get("batch_ids") or []:
+        socketio.emit('style_job', dict(data, batch_id=batch_id), room=f"batch:{batch_id}")
+
+
+job_store.add_listener(push_job_update)
+
+
+@style_bp.route('/jobs', methods=['POST'], strict_slashes=False)
+def submit_style_job():
+    try:
+        parsed = parse_style_request(request.json)
+        if not parsed:
+            return jsonify({
+                "status": "error", 
+                "message": "Data tidak lengkap (perlu image_base64 dan value)"
+            }), 400
+
+        image_bytes, final_prompt, ui_value, category = parsed
+        job = lightx_jobs.submit(image_bytes, final_prompt, category=category, style=ui_value)
+        return jsonify({"status": "success", "data": job_to_json(job)}), 202
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"status": "error", "message": f"Server Error: {str(e)}"}), 500
+
+
+@style_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_style_job(job_id):
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job tidak ditemukan"}), 404
+    return jsonify({"status": "success", "data": job_to_json(job)}), 200
+
+
+@style_bp.route('/jobs/<job_id>/image', methods=['GET'])
+def get_style_job_image(job_id):
+    """Hasil job sebagai image/jpeg biner (tanpa base64)."""
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job tidak ditemukan"}), 404
+    if job["state"] != "done":
+        return jsonify({"status": "error", "message": f"Job belum selesai ({job['state']})"}), 409
+    return image_response(job["result"], "jpeg")
+
+
+@style_bp.route('/render', methods=['POST'], strict_slashes=False)
+def render_style():
+    """
+    Versi biner dari /edit-style: multipart `image` + field `value`,
+    balasan langsung image/jpeg hasil LightX (atau 202 + URL status job
+    jika belum selesai dalam LIGHTX_SYNC_WAIT detik).
+    """
+    try:
+        file = request.files.get('image')
+        ui_value = request.form.get('value') or request.form.get('style_name')
+        if not file or not ui_value:
+            return jsonify({
+                "status": "error",
+                "message": "Data tidak lengkap (perlu image dan value)"
+            }), 400
+
+        final_prompt, category = build_prompt(ui_value)
+        job = lightx_jobs.submit(file.read(), final_prompt, category=category, style=ui_value)
+        job = job_store.wait(job["id"], timeout=Config.LIGHTX_SYNC_WAIT)
+
+        if job and job["state"] not in FINAL_STATES:
+            return job_pending_response(job)
+        if not job or job["state"] != "done":
+            return jsonify({
+                "status": "error",
+                "message": (job or {}).get("error") or "Gagal mendapatkan hasil (timeout atau failed)"
+            }), 500
+
+        return image_response(job["result"], "jpeg", headers={"X-Job-Id": job["id"]})
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"status": "error", "message": f"Server Error: {str(e)}"}), 500
+
+
+# ==============================================================================
+# 4. ENDPOINT: BATCH "COBA SEMUA STYLE"
+# ==============================================================================
+# POST /api/style/batch {image_base64, styles?: [...], category?: "hair"}
+#   - default            → 202 + batch_id & daftar job (hasil via Socket.IO / GET)
+#   - ?stream=1 / Accept: application/x-ndjson → satu baris JSON per style
+#     dikirim begitu selesai (chunked), total waktu ≈ style paling lambat
+# Socket.IO: emit 'subscribe_batch' {"batch_id": ...} → event 'style_job' per style
+def batch_to_json(batch):
+    return {
+        "batch_id": batch["id"],
+        "jobs": [job_to_json(job_store.get(job_id)) for job_id in batch["job_ids"] if job_store.get(job_id)]
+    }
+
+
+@style_bp.route('/batch', methods=['POST'], strict_slashes=False)
+def submit_style_batch():
+    try:
+        data = request.json or {}
+        original_base64 = data.get('image_base64')
+        styles = data.get('styles') or STYLE_CATEGORIES.get(data.get('category', 'hair'), [])
+
+        if not original_base64 or not styles:
+            return jsonify({
+                "status": "error",
+                "message": "Data tidak lengkap (perlu image_base64 dan styles/category)"
+            }), 400
+        if not isinstance(styles, list) or not all(isinstance(style, str) and style for style in styles):
+            return jsonify({"status": "error", "message": "styles harus berupa list nama style"}), 400
+        if len(styles) > len(STYLES_DB):
+            return jsonify({"status": "error", "message": f"Maksimal {len(STYLES_DB)} style per batch"}), 400
+
+        if "," in original_base64:
+            original_base64 = original_base64.split(",")[1]
+        image_bytes = base64.b64decode(original_base64)
+
+        items = []
+        for style in dict.fromkeys(styles):   # buang duplikat, urutan tetap
+            final_prompt, category = build_prompt(style)
+            items.append({"prompt": final_prompt, "category": category, "style": style})
+
+        batch, jobs = lightx_jobs.submit_batch(image_bytes, items)
+        print(f">>> [AI GEN] Batch {batch['id']}: {len(items)} style")
+
+        stream = request.args.get('stream') in ('1', 'true') \
+            or 'application/x-ndjson' in request.headers.get('Accept', '')
+        if not stream:
+            return jsonify({"status": "success", "data": batch_to_json(batch)}), 202
+
+        return Response(
+            stream_with_context(stream_batch(batch, [job["id"] for job in jobs])),
+            mimetype='application/x-ndjson'
+        )
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"status": "error", "message": f"Server Error: {str(e)}"}), 500
+
+
+def stream_batch(batch, job_ids):
+    yield json.dumps({"event": "batch", **batch_to_json(batch)}) + "\n"
+
+    remaining = list(dict.fromkeys(job_ids))
+    deadline = time.monotonic() + Config.LIGHTX_POLL_DEADLINE + 120
+    while remaining and time.monotonic() < deadline:
+        finished = job_store.wait_any(remaining, timeout=deadline - time.monotonic())
+        for job_id in finished:
+            remaining.remove(job_id)
+            job = job_store.get(job_id)
+            if job:
+                yield json.dumps({"event": "job", **job_to_json(job)}) + "\n"
+
+    yield json.dumps({"event": "end", "batch_id": batch["id"], "timeout": bool(remaining)}) + "\n"
+
+
+@style_bp.route('/batch/<batch_id>', methods=['GET'])
+def get_style_batch(batch_id):
+    batch = lightx_jobs.get_batch(batch_id)
+    if not batch:
+        return jsonify({"status": "error", "message": "Batch tidak ditemukan"}), 404
+    return jsonify({"status": "success", "data": batch_to_json(batch)}), 200
+
+
+# ==============================================================================
+# 5. ENDPOINT LAINNYA (ANALYZE & CHAT)
 # ==============================================================================
+# Hasil analyze terakhir per (user, hash gambar): retry / upload ulang foto
+# yang sama dalam 5 menit tidak membuat dokumen style_history baru. Yang
+# disimpan hanya field analisis + key blob (tanpa foto base64); foto dibaca
+# ulang dari blob storage saat dipakai.
+recent_analyses = TTLCache(max_size=1024, ttl=300)
+
+
+def recent_response(recent):
+    """Respons analyze dari entri cache, atau None jika fotonya sudah dihapus."""
+    if not recent.get('image_key'):
+        return {**recent, 'photo_base64': ""}
+    photo = blob_store.get(recent['image_key'])
+    if photo is None:
+        return None
+    return {**recent, 'photo_base64': base64.b64encode(photo).decode('utf-8')}
+
 @style_bp.route('/analyze', methods=['POST'], strict_slashes=False)
 def analyze():
     print("\n>>> [API] Request Analyze Masuk! <<<")
@@ -318,20 +387,22 @@ def analyze():
         gender = request.form.get('gender', 'Pria')
         
         img_bytes = file.read()
-        res = ai_service.analyze_face(img_bytes) 
+        img_hash = content_hash(img_bytes)
+
+        recent_key = f"{user_id}:{gender}:{img_hash}"
+        recent = recent_analyses.get(recent_key)
+        resp = recent_response(recent) if recent is not None else None
+        if resp is not None:
+            print(">>> [API] Analyze duplikat, pakai hasil sebelumnya")
+            return jsonify({"status": "success", "data": resp}), 200
+
+        res = ai_service.analyze_face(img_bytes, img_hash=img_hash)
         if not res: 
             return jsonify({"status": "error", "message": "Face analysis failed"}), 400
         
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        img_base64 = ""
-        if img is not None:
-            h, w = img.shape[:2]
-            new_w = 400
-            new_h = int(h * (new_w / w))
-            resized = cv2.resize(img, (new_w, new_h))
-            _, buf = cv2.imencode('.jpg', resized, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-            img_base64 = base64.b64encode(buf).decode('utf-8')
+        # Foto lebar 400px + thumbnail (di worker gambar) → blob storage
+        keys, photo = store_history_images(img_bytes, width=400, quality=70)
+        img_base64 = base64.b64encode(photo).decode('utf-8') if photo else ""
             
         raw_recs = res['recommendations']
         recs = raw_recs.split(", ") if gender in ['Pria', 'Laki-laki'] else ["Long Layer Cut", "Bob Cut"]
@@ -344,13 +415,18 @@ def analyze():
             "confidence": res['confidence'], 
             "timestamp": now, 
             "recommendations": recs, 
-            "photo_base64": img_base64
+            **(keys or {})
         }
-        db.collection('style_history').add(db_data)
+        aggregates.add('styles', db_data, event='analyses')
         
         resp = db_data.copy()
         resp['timestamp'] = now.isoformat()
+        recent_analyses.set(recent_key, resp.copy())
+        resp['photo_base64'] = img_base64
         return jsonify({"status": "success", "data": resp}), 200
+
+    except WorkerPoolSaturated as e:
+        return jsonify({"status": "error", "message": str(e)}), 503, {"Retry-After": str(e.retry_after)}
         
     except Exception as e:
         print(f"❌ Error Analyze: {e}")
@@ -0,0 +1,125 @@
+from firebase_admin import firestore
+from app.extensions import db
+from app.services.rollups import rollups
+
+
+# ==============================================================================
+# AGREGAT DASHBOARD ADMIN (dijaga incremental)
+# ==============================================================================
+# Satu dokumen `stats/dashboard` berisi total user, style history, feedback,
+# jumlah & histogram rating. Setiap create/delete menulis dokumen data dan
+# counter dalam SATU commit (batch/transaction), jadi dashboard cukup membaca
+# dokumen ini tanpa men-scan koleksi. rebuild() menghitung ulang dari nol.
+
+COLLECTIONS = {
+    "users": "users",
+    "styles": "style_history",
+    "feedbacks": "feedbacks",
+}
+
+
+def parse_rating(value):
+    """Rating 1–5 (int) atau None jika tidak valid."""
+    try:
+        rating = int(value)
+    except (TypeError, ValueError):
+        return None
+    return rating if 1 <= rating <= 5 else None
+
+
+class DashboardAggregates:
+    def __init__(self, db):
+        self.db = db
+        self.ref = db.collection('stats').document('dashboard')
+
+    # --- Perubahan counter ---
+    def _deltas(self, kind, data, sign):
+        deltas = {kind: firestore.Increment(sign), "updated_at": firestore.SERVER_TIMESTAMP}
+        if kind == "feedbacks":
+            rating = parse_rating(data.get('rating'))
+            if rating is not None:
+                deltas["rating_sum"] = firestore.Increment(sign * rating)
+                deltas["ratings"] = {str(rating): firestore.Increment(sign)}
+        return deltas
+
+    def create(self, kind, doc_ref, data, event=None):
+        """
+        Buat dokumen baru + naikkan counter (dan rollup `event`) secara atomik.
+        Raise google.api_core.exceptions.AlreadyExists jika dokumen sudah ada.
+        """
+        batch = self.db.batch()
+        batch.create(doc_ref, data)
+        batch.set(self.ref, self._deltas(kind, data, 1), merge=True)
+        if event:
+            rollups.stage(batch, event)
+        batch.commit()
+        return doc_ref
+
+    def add(self, kind, data, event=None):
+        """Seperti collection.add(): dokumen dengan ID otomatis."""
+        return self.create(kind, self.db.collection(COLLECTIONS[kind]).document(), data, event)
+
+    def delete(self, kind, doc_ref):
+        """Hapus dokumen + turunkan counter (transaction). Return data lama atau None."""
+        return _delete_in_transaction(self.db.transaction(), doc_ref, self.ref, self._deltas, kind)
+
+    def stage_count(self, batch, kind, delta):
+        """Ubah counter `kind` sebesar `delta` di batch yang sedang disusun (operasi massal)."""
+        batch.set(self.ref, {
+            kind: firestore.Increment(delta), "updated_at": firestore.SERVER_TIMESTAMP
+        }, merge=True)
+
+    # --- Baca ---
+    def read(self):
+        """Ringkasan untuk dashboard; hitung ulang sekali jika dokumen belum ada."""
+        doc = self.ref.get()
+        data = doc.to_dict() if doc.exists else self.rebuild()
+
+        feedbacks = data.get('feedbacks', 0)
+        ratings = data.get('ratings', {})
+        return {
+            "users": data.get('users', 0),
+            "styles": data.get('styles', 0),
+            "feedbacks": feedbacks,
+            "avg_rating": round(data.get('rating_sum', 0) / feedbacks, 1) if feedbacks > 0 else 0,
+            "ratings": [ratings.get(str(i), 0) for i in range(1, 6)]
+        }
+
+    # --- Hitung ulang dari nol ---
+    def rebuild(self):
+        data = {
+            kind: self._count(self.db.collection(name))
+            for kind, name in COLLECTIONS.items()
+        }
+
+        # Histogram: hanya field rating yang diambil (tanpa isi feedback)
+        ratings, rating_sum = {str(i): 0 for i in range(1, 6)}, 0
+        for doc in self.db.collection('feedbacks').select(['rating']).stream():
+            rating = parse_rating(doc.to_dict().get('rating'))
+            if rating is not None:
+                ratings[str(rating)] += 1
+                rating_sum += rating
+
+        data.update(ratings=ratings, rating_sum=rating_sum, updated_at=firestore.SERVER_TIMESTAMP)
+        self.ref.set(data)
+        return data
+
+    @staticmethod
+    def _count(query):
+        # Aggregation query di server: tidak ada dokumen yang diunduh
+        return int(query.count().get()[0][0].value)
+
+
+@firestore.transactional
+def _delete_in_transaction(transaction, doc_ref, agg_ref, deltas, kind):
+    snapshot = doc_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        return None
+
+    data = snapshot.to_dict()
+    transaction.delete(doc_ref)
+    transaction.set(agg_ref, deltas(kind, data, -1), merge=True)
+    return data
+
+
+aggregates = DashboardAggregates(db)
@@ -1,7 +1,153 @@
 import os
+import queue
+import threading
+import time
 import cv2
 import numpy as np
 import tensorflow as tf
+from config import Config
+from app.utils.metrics import LatencyRecorder
+from app.utils.pool import ResourcePool
+from app.services.face_detector import create_face_detector, detect_bounded
+from app.services.analysis_cache import AnalysisCache, content_hash
+from app.services.image_workers import image_workers
+
+
+# ==============================================================================
+# MICRO-BATCHING ENGINE UNTUK INTERPRETER TFLITE
+# ==============================================================================
+class _PendingInference:
+    """Satu crop wajah yang menunggu giliran masuk batch."""
+
+    def __init__(self, face_array):
+        self.face_array = face_array
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class PooledInterpreter:
+    """Interpreter TFLite milik pool, beserta ukuran batch yang sedang dialokasikan."""
+
+    def __init__(self, model_file, num_threads=1):
+        self.interpreter = tf.lite.Interpreter(
+            model_path=model_file, num_threads=num_threads
+        )
+        self.interpreter.allocate_tensors()
+
+        input_detail = self.interpreter.get_input_details()[0]
+        self.input_index = input_detail['index']
+        self.input_shape = list(input_detail['shape'][1:])
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.current_batch = int(input_detail['shape'][0])
+
+
+class BatchInferenceEngine:
+    """
+    Kumpulkan crop dari request yang datang bersamaan (maksimal `window_ms`
+    atau `max_batch_size` gambar), jalankan satu invoke(), lalu bagikan
+    vektor skor ke masing-masing pemanggil.
+
+    Setiap worker meminjam interpreter dari pool, sehingga beberapa batch
+    bisa berjalan paralel di core yang berbeda.
+    """
+
+    # Ukuran batch dibulatkan ke bucket ini agar interpreter tidak
+    # realokasi tensor untuk setiap jumlah gambar yang berbeda
+    BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+    def __init__(self, pool, max_batch_size=8, window_ms=5.0):
+        self.pool = pool
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.invoke_times = LatencyRecorder()
+
+        self._queue = queue.Queue()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"tflite-batcher-{i}", daemon=True)
+            for i in range(pool.size)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    # --- Dipanggil oleh thread request ---
+    def predict(self, face_array, timeout=30):
+        item = _PendingInference(face_array)
+        self._queue.put(item)
+
+        if not item.done.wait(timeout):
+            raise TimeoutError("Inferensi batch melebihi batas waktu")
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    # --- Jalankan satu batch langsung (dipakai worker & benchmark) ---
+    def run_batch(self, inputs):
+        with self.pool.checkout() as pooled:
+            return self._invoke(pooled, inputs)
+
+    def _invoke(self, pooled, inputs):
+        n = inputs.shape[0]
+        padded_n = next((b for b in self.BATCH_BUCKETS if b >= n), n)
+
+        # Padding nol sampai ukuran bucket
+        if padded_n != n:
+            pad = np.zeros((padded_n - n, *inputs.shape[1:]), dtype=inputs.dtype)
+            inputs = np.concatenate([inputs, pad], axis=0)
+
+        interpreter = pooled.interpreter
+        if padded_n != pooled.current_batch:
+            interpreter.resize_tensor_input(
+                pooled.input_index, [padded_n] + pooled.input_shape
+            )
+            interpreter.allocate_tensors()
+            pooled.current_batch = padded_n
+
+        start = time.perf_counter()
+        interpreter.set_tensor(pooled.input_index, inputs)
+        interpreter.invoke()
+        self.invoke_times.record((time.perf_counter() - start) * 1000)
+
+        # Copy agar hasil tidak tertimpa oleh invoke() berikutnya
+        return interpreter.get_tensor(pooled.output_index)[:n].copy()
+
+    # --- Loop worker: kumpulkan → invoke → bagikan hasil ---
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                inputs = np.stack([item.face_array for item in batch])
+                predictions = self.run_batch(inputs)
+                for item, prediction in zip(batch, predictions):
+                    item.result = prediction
+            except Exception as e:
+                print(f"❌ Error saat inferensi batch: {e}")
+                for item in batch:
+                    item.error = e
+            finally:
+                for item in batch:
+                    item.done.set()
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "invoke_ms": self.invoke_times.snapshot()
+        }
+
 
 class AIService:
     def __init__(self):
@@ -13,34 +159,67 @@ class AIService:
 
         # --- GABUNGKAN DENGAN FOLDER MODEL (cross platform Windows/Linux) ---
         self.model_path = os.path.join(app_dir, 'model_ai')
-        
+
         # Label hasil prediksi bentuk wajah
         self.class_names = ['Oval', 'Round', 'Square']
-        self.interpreter = None
+        self.pool = None
+        self.engine = None
+
+        # Detector wajah dimuat sekali (bukan per request)
+        self.face_detector = create_face_detector()
 
         print(f"DEBUG: Mencari model di: {self.model_path}")
 
+        # Path file model TFLite
+        tflite_file = os.path.join(self.model_path, "face_shape_model.tflite")
+
+        # Cache hasil analisis: upload ulang / retry foto yang sama tidak
+        # perlu decode + deteksi + inferensi lagi
+        self.cache = AnalysisCache(
+            tflite_file,
+            max_size=Config.AI_CACHE_SIZE,
+            ttl=Config.AI_CACHE_TTL,
+            disk_dir=Config.AI_CACHE_DIR
+        )
+
         try:
-            # Path file model TFLite
-            tflite_file = os.path.join(self.model_path, "face_shape_model.tflite")
-            
             # Cek apakah model benar-benar ada
             if not os.path.exists(tflite_file):
                 print(f"❌ ERROR: File {tflite_file} tidak ditemukan!")
             else:
-                # Load dan inisialisasi interpreter TFLite
-                self.interpreter = tf.lite.Interpreter(model_path=tflite_file)
-                self.interpreter.allocate_tensors()
+                # Pool interpreter TFLite: AI_INTERPRETER_POOL_SIZE instance, masing-masing
+                # dengan num_threads sendiri (interpreter tidak thread-safe)
+                self.pool = ResourcePool(
+                    lambda: PooledInterpreter(tflite_file, Config.AI_INTERPRETER_THREADS),
+                    size=Config.AI_INTERPRETER_POOL_SIZE,
+                    name="tflite",
+                    # Jika inferensi dijalankan di worker process, proses web tidak perlu memuat model
+                    lazy=Config.IMAGE_WORKERS > 0
+                )
 
-                # Ambil detail input dan output model
-                self.input_details = self.interpreter.get_input_details()
-                self.output_details = self.interpreter.get_output_details()
+                self.engine = BatchInferenceEngine(
+                    self.pool,
+                    max_batch_size=Config.AI_BATCH_MAX_SIZE,
+                    window_ms=Config.AI_BATCH_WINDOW_MS
+                )
                 print("✅ Model TFLite Berhasil Dimuat!")
         except Exception as e:
             print(f"❌ Error saat inisialisasi AI: {e}")
 
 
-    def analyze_face(self, img_bytes):
+    def analyze_face(self, img_bytes, img_hash=None):
+        img_hash = img_hash or content_hash(img_bytes)
+        cached = self.cache.get(img_hash)
+        if cached is not None:
+            return cached
+
+        # Decode + deteksi + inferensi di worker gambar (inline jika nonaktif)
+        result = image_workers.run('analyze_face', img_bytes)
+        if result is not None:
+            self.cache.set(img_hash, result)
+        return result
+
+    def _analyze_face(self, img_bytes):
         try:
             # Convert bytes → np array → OpenCV image
             nparr = np.frombuffer(img_bytes, np.uint8)
@@ -48,12 +227,9 @@ class AIService:
             if img is None:
                 return None
 
-            # Deteksi wajah menggunakan Haar Cascade
-            face_cascade = cv2.CascadeClassifier(
-                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            )
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+            # Deteksi wajah pada gambar yang diperkecil (Haar / YuNet / MediaPipe),
+            # kotak hasil sudah dalam koordinat resolusi penuh untuk crop
+            faces = detect_bounded(self.face_detector, img, Config.FACE_DETECT_MAX_SIDE)
 
             if len(faces) == 0:
                 return None  # Tidak ada wajah ditemukan
@@ -69,7 +245,7 @@ class AIService:
             y1 = max(0, y - offset_h)
             x2 = min(img.shape[1], x + w + offset_w)
             y2 = min(img.shape[0], y + h + offset_h)
-            
+
             # Crop wajah
             face_img = img[y1:y2, x1:x2]
 
@@ -80,45 +256,50 @@ class AIService:
             face_resized = cv2.resize(face_rgb, (224, 224))
 
             # Tidak dibagi 255 karena EfficientNet scaling internal
-            img_array = np.expand_dims(face_resized, axis=0).astype('float32')
+            face_array = face_resized.astype('float32')
 
-            # Set input ke model
-            self.interpreter.set_tensor(
-                self.input_details[0]['index'], img_array
-            )
-            self.interpreter.invoke()
-
-            # Ambil hasil output
-            prediction = self.interpreter.get_tensor(
-                self.output_details[0]['index']
-            )[0]
-
-            # Ambil kelas dengan skor tertinggi
-            idx = np.argmax(prediction)
-            shape = self.class_names[idx]
-            
-            # Buat output untuk semua skor (dalam %)
-            all_scores = {
-                self.class_names[i]: f"{round(float(prediction[i] * 100), 2)}%"
-                for i in range(len(self.class_names))
-            }
-
-            # Rekomendasi gaya rambut berdasarkan bentuk wajah
-            recs_map = {
-                "Oval": "Undercut, Pompadour, Side Part",
-                "Round": "Faux Hawk, High Fade, Quiff",
-                "Square": "Buzz Cut, Crew Cut, Slicked Back"
-            }
-
-            return {
-                "face_shape": shape,
-                "confidence": f"{round(float(prediction[idx] * 100), 2)}%",
-                "all_scores": all_scores,
-                "recommendations": recs_map.get(shape, "Standar")
-            }
+            # Masuk antrian micro-batch, tunggu skor milik request ini
+            prediction = self.engine.predict(face_array)
+
+            return self.format_prediction(prediction)
 
         except Exception as e:
             print(f"❌ Error saat analisis wajah: {e}")
             return None
 
+    def stats(self):
+        if self.engine is None:
+            return {"loaded": False, "cache": self.cache.stats()}
+        return {
+            "loaded": True,
+            "pool": self.pool.stats(),
+            "engine": self.engine.stats(),
+            "cache": self.cache.stats()
+        }
+
+    def format_prediction(self, prediction):
+        # Ambil kelas dengan skor tertinggi
+        idx = np.argmax(prediction)
+        shape = self.class_names[idx]
+
+        # Buat output untuk semua skor (dalam %)
+        all_scores = {
+            self.class_names[i]: f"{round(float(prediction[i] * 100), 2)}%"
+            for i in range(len(self.class_names))
+        }
+
+        # Rekomendasi gaya rambut berdasarkan bentuk wajah
+        recs_map = {
+            "Oval": "Undercut, Pompadour, Side Part",
+            "Round": "Faux Hawk, High Fade, Quiff",
+            "Square": "Buzz Cut, Crew Cut, Slicked Back"
+        }
+
+        return {
+            "face_shape": shape,
+            "confidence": f"{round(float(prediction[idx] * 100), 2)}%",
+            "all_scores": all_scores,
+            "recommendations": recs_map.get(shape, "Standar")
+        }
+
 ai_service = AIService()
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from app.utils.cache import TTLCache
+
+
+# ==============================================================================
+# CACHE HASIL ANALISIS BENTUK WAJAH (content-addressed)
+# ==============================================================================
+# Key = sha256(bytes gambar) + versi model (sha256 file .tflite).
+# Tier 1: LRU in-memory dengan TTL. Tier 2 (opsional): file JSON di disk yang
+# bertahan saat restart, dikelompokkan per versi model.
+
+def content_hash(img_bytes):
+    return hashlib.sha256(img_bytes).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, model_file, max_size=512, ttl=3600, disk_dir=None):
+        self.model_file = model_file
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk_dir = disk_dir or None
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._lock = threading.Lock()
+        self._model_stat = None
+        self.model_version = None
+        self._check_model()
+
+    # --- Versi model: berubah otomatis saat file .tflite diganti ---
+    def _check_model(self):
+        try:
+            st = os.stat(self.model_file)
+            stat_key = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat_key = None
+
+        if stat_key == self._model_stat:
+            return
+
+        with self._lock:
+            if stat_key == self._model_stat:
+                return
+
+            if stat_key is None:
+                version = "no-model"
+            else:
+                sha = hashlib.sha256()
+                with open(self.model_file, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        sha.update(chunk)
+                version = sha.hexdigest()[:16]
+
+            if version != self.model_version:
+                if self.model_version is not None:
+                    print(f"♻️ Model berubah ({self.model_version} → {version}), cache analisis dikosongkan")
+                    self.memory.clear()
+                # Hapus cache disk milik versi model lain (termasuk sisa sebelum restart)
+                self._purge_disk(keep=version)
+
+            self.model_version = version
+            self._model_stat = stat_key
+
+    def _purge_disk(self, keep):
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return
+        for name in os.listdir(self.disk_dir):
+            if name != keep:
+                shutil.rmtree(os.path.join(self.disk_dir, name), ignore_errors=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, self.model_version, f"{key}.json")
+
+    # --- API ---
+    def get(self, img_hash):
+        self._check_model()
+        key = f"{self.model_version}:{img_hash}"
+
+        result = self.memory.get(key)
+        if result is not None:
+            return result
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(img_hash), 'r') as f:
+                    result = json.load(f)
+                self.disk_hits += 1
+                self.memory.set(key, result)
+                return result
+            except (OSError, ValueError):
+                self.disk_misses += 1
+        return None
+
+    def set(self, img_hash, result):
+        self._check_model()
+        self.memory.set(f"{self.model_version}:{img_hash}", result)
+
+        if self.disk_dir:
+            path = self._disk_path(img_hash)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Tulis ke file sementara lalu rename agar atomik
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(result, f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ Gagal menulis cache analisis ke disk: {e}")
+
+    def stats(self):
+        return {
+            "model_version": self.model_version,
+            "memory": self.memory.stats(),
+            "disk": {
+                "enabled": bool(self.disk_dir),
+                "hits": self.disk_hits,
+                "misses": self.disk_misses
+            }
+        }
@@ -0,0 +1,130 @@
+import glob
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from config import Config
+from app.utils.cache import TTLCache
+
+# Folder assets di root project (tidak tergantung working directory)
+ASSETS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'assets'
+)
+
+
+# ==============================================================================
+# REGISTRY ASSET OVERLAY (rambut / kacamata / hijab)
+# ==============================================================================
+# Semua PNG di bawah assets/ dimuat sekali saat startup sebagai BGRA
+# premultiplied-alpha (warna sudah dikali alpha). Hasil transformasi
+# (resize + rotasi + soft edge) disimpan di LRU kecil per (asset, lebar, sudut).
+
+def to_premultiplied(image):
+    """PNG BGR/BGRA → BGRA uint8 dengan channel warna dikali alpha."""
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+    elif image.shape[2] == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+
+    alpha = image[:, :, 3:4].astype(np.uint16)
+    premult = image.copy()
+    premult[:, :, :3] = ((image[:, :, :3].astype(np.uint16) * alpha + 127) // 255).astype(np.uint8)
+    return premult
+
+
+class AssetRegistry:
+    # Sudut rotasi dibulatkan ke kelipatan ini agar hasil transform bisa dipakai ulang
+    ANGLE_STEP = 2.0
+
+    def __init__(self, assets_dir=ASSETS_DIR, cache_size=64, reload_interval=2.0):
+        self.assets_dir = assets_dir
+        self.reload_interval = reload_interval
+        self.transforms = TTLCache(max_size=cache_size, ttl=0)
+        self._assets = {}   # key 'kategori/nama' → BGRA premultiplied
+        self._mtimes = {}   # key → mtime file
+        self._lock = threading.Lock()
+        self._last_scan = 0.0
+        self.reload()
+
+    # --- Scan folder, muat ulang file baru/berubah, buang yang terhapus ---
+    def reload(self):
+        found = {}
+        for path in glob.glob(os.path.join(self.assets_dir, '**', '*.png'), recursive=True):
+            key = os.path.splitext(os.path.relpath(path, self.assets_dir))[0].replace(os.sep, '/')
+            try:
+                found[key] = (path, os.stat(path).st_mtime_ns)
+            except OSError:
+                continue
+
+        changed = False
+        with self._lock:
+            for key in list(self._assets):
+                if key not in found:
+                    del self._assets[key]
+                    del self._mtimes[key]
+                    changed = True
+
+            for key, (path, mtime) in found.items():
+                if self._mtimes.get(key) == mtime:
+                    continue
+                image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                if image is None:
+                    continue
+                self._assets[key] = to_premultiplied(image)
+                self._mtimes[key] = mtime
+                changed = True
+
+            self._last_scan = time.monotonic()
+
+        if changed:
+            # Hasil transform lama mungkin berasal dari file yang sudah berubah
+            self.transforms.clear()
+            print(f"✅ Asset overlay dimuat: {len(self._assets)} file")
+
+    def _maybe_reload(self):
+        if self.reload_interval and time.monotonic() - self._last_scan >= self.reload_interval:
+            self.reload()
+
+    def get(self, category, asset_name):
+        self._maybe_reload()
+        return self._assets.get(f"{category}/{asset_name}")
+
+    # --- Asset yang sudah di-resize, dirotasi & dihaluskan (premultiplied) ---
+    def get_transformed(self, category, asset_name, width, angle):
+        asset = self.get(category, asset_name)
+        if asset is None or width <= 0:
+            return None
+
+        angle_bucket = round(angle / self.ANGLE_STEP) * self.ANGLE_STEP
+        key = (category, asset_name, int(width), angle_bucket)
+        cached = self.transforms.get(key)
+        if cached is not None:
+            return cached
+
+        # Resize dulu ke ukuran target, baru rotasi (jauh lebih murah
+        # daripada merotasi asset ukuran penuh)
+        height = max(1, int(width * asset.shape[0] / asset.shape[1]))
+        interp = cv2.INTER_AREA if width < asset.shape[1] else cv2.INTER_LINEAR
+        resized = cv2.resize(asset, (int(width), height), interpolation=interp)
+
+        # Rotasi mengikuti kepala; area kosong = transparan (premultiplied 0)
+        M = cv2.getRotationMatrix2D((width / 2, height / 2), -angle_bucket, 1)
+        rotated = cv2.warpAffine(
+            resized, M, (int(width), height),
+            flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0, 0)
+        )
+
+        # Soft edge: blur semua channel premultiplied agar tepi stiker halus
+        result = cv2.GaussianBlur(rotated, (3, 3), 0)
+        self.transforms.set(key, result)
+        return result
+
+    def stats(self):
+        return {"assets": len(self._assets), "transforms": self.transforms.stats()}
+
+
+asset_registry = AssetRegistry(
+    cache_size=Config.ASSET_TRANSFORM_CACHE_SIZE,
+    reload_interval=Config.ASSET_RELOAD_INTERVAL
+)
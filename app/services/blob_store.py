@@ -0,0 +1,101 @@
+import os
+import threading
+from config import Config
+
+
+# ==============================================================================
+# BLOB STORAGE GAMBAR (Firebase Storage / folder lokal)
+# ==============================================================================
+# Dokumen Firestore hanya menyimpan key; bytes gambar ada di sini.
+# Backend 'gcs' memakai `bucket` dari extensions, backend 'local' menyimpan
+# file di folder (untuk development / pengujian tanpa Firebase).
+
+# Batas sub-request dalam satu batch request Cloud Storage
+GCS_BATCH_LIMIT = 100
+
+
+class LocalBlobStore:
+    name = "local"
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Key blob tidak valid: {key}")
+        return path
+
+    def put(self, key, data, content_type="image/jpeg"):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Tulis ke file sementara lalu rename agar atomik
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+
+
+class GCSBlobStore:
+    name = "gcs"
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def put(self, key, data, content_type="image/jpeg"):
+        blob = self.bucket.blob(key)
+        # Key tidak pernah ditimpa isi berbeda → aman di-cache lama
+        blob.cache_control = "private, max-age=31536000, immutable"
+        blob.upload_from_string(data, content_type=content_type)
+
+    def get(self, key):
+        from google.api_core.exceptions import NotFound
+        try:
+            return self.bucket.blob(key).download_as_bytes()
+        except NotFound:
+            return None
+
+    def delete(self, key):
+        from google.api_core.exceptions import NotFound
+        try:
+            self.bucket.blob(key).delete()
+        except NotFound:
+            pass
+
+    def delete_many(self, keys):
+        """Hapus banyak blob lewat batch request GCS (maks 100 operasi per request)."""
+        keys = list(keys)
+        for start in range(0, len(keys), GCS_BATCH_LIMIT):
+            # raise_exception=False → blob yang sudah tidak ada (404) diabaikan
+            with self.bucket.client.batch(raise_exception=False):
+                for key in keys[start:start + GCS_BATCH_LIMIT]:
+                    self.bucket.delete_blob(key)
+
+
+def create_blob_store(backend=None):
+    backend = (backend or Config.BLOB_BACKEND).lower()
+    if backend == 'local':
+        return LocalBlobStore(Config.BLOB_LOCAL_DIR)
+
+    from app.extensions import bucket
+    return GCSBlobStore(bucket)
+
+
+blob_store = create_blob_store()
@@ -4,23 +4,121 @@ import numpy as np
 import base64
 import os
 import math
+import time
+from config import Config
+from app.services.asset_registry import asset_registry
+from app.utils.pool import ResourcePool
+from app.utils.blending import mask_bbox, blend_masked, blend_premultiplied
+
+# Jenis edit yang didukung pipeline
+EDIT_TYPES = ('color', 'hair', 'glasses', 'hijab')
+
+class FaceAnalysisContext:
+    """
+    Hasil analisis MediaPipe (face mesh & segmentasi) untuk satu gambar.
+    Dihitung lazy saat pertama dibutuhkan, lalu dipakai ulang oleh semua
+    edit dalam satu request (warna → kacamata → hijab cukup 1x face mesh).
+    """
+
+    def __init__(self, service, image, proxy_max_side=0):
+        self.service = service
+        self.image = image
+        self.height, self.width = image.shape[:2]
+        # > 0: analisis dijalankan pada gambar proxy (sisi terpanjang ≤ nilai ini)
+        self.proxy_max_side = proxy_max_side
+        self._rgb = None
+        self._landmarks = None
+        self._landmarks_done = False
+        self._segmentation_mask = None
+        # Durasi (ms) tiap analisis MediaPipe yang benar-benar dijalankan
+        self.timings = {}
+
+    def update(self, image):
+        # Gambar hasil edit sebelumnya; geometri wajah tetap sama sehingga
+        # landmark & mask yang sudah dihitung tetap berlaku
+        self.image = image
+        self._rgb = None
+
+    @property
+    def rgb(self):
+        # Input analisis MediaPipe (resolusi penuh atau proxy yang diperkecil)
+        if self._rgb is None:
+            src = self.image
+            longest = max(self.height, self.width)
+            if self.proxy_max_side and longest > self.proxy_max_side:
+                scale = self.proxy_max_side / longest
+                src = cv2.resize(
+                    src, (max(1, int(self.width * scale)), max(1, int(self.height * scale))),
+                    interpolation=cv2.INTER_AREA
+                )
+            self._rgb = cv2.cvtColor(src, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    @property
+    def landmarks(self):
+        # None jika wajah tidak terdeteksi
+        if not self._landmarks_done:
+            start = time.perf_counter()
+            with self.service.graphs.checkout() as graphs:
+                results = graphs.face_mesh.process(self.rgb)
+            if results.multi_face_landmarks:
+                self._landmarks = results.multi_face_landmarks[0].landmark
+            self._landmarks_done = True
+            self.timings['face_mesh_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return self._landmarks
+
+    @property
+    def segmentation_mask(self):
+        if self._segmentation_mask is None:
+            start = time.perf_counter()
+            # Mask di resolusi analisis; pemakai meng-upsample hanya area yang dibutuhkan
+            with self.service.graphs.checkout() as graphs:
+                # Copy: numpy_view milik graph, bisa tertimpa setelah graph dikembalikan
+                self._segmentation_mask = graphs.segment.process(self.rgb).segmentation_mask.copy()
+            self.timings['segmentation_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return self._segmentation_mask
+
+
+class MediaPipeGraphs:
+    """Satu pasang graph MediaPipe (segmentasi + face mesh) milik pool."""
 
-class EditService:
     def __init__(self):
         # Segmentasi selfie Mediapipe:
         # digunakan untuk memisahkan bagian tubuh/ rambut dari background
-        self.mp_selfie = mp.solutions.selfie_segmentation
-        self.segment = self.mp_selfie.SelfieSegmentation(model_selection=1)
-        
+        self.segment = mp.solutions.selfie_segmentation.SelfieSegmentation(model_selection=1)
+
         # Face Mesh Mediapipe:
         # memberikan koordinat titik wajah (468 landmark) untuk presisi posisi stiker
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
             static_image_mode=True, 
             max_num_faces=1, 
             refine_landmarks=True
         )
 
+
+class EditService:
+    def __init__(self, processing_mode=None, proxy_max_side=None, graph_pool_size=None):
+        # 'proxy': segmentasi & landmark dihitung di gambar kecil, hanya komposit
+        # akhir di resolusi penuh. 'full': semua di resolusi upload (perilaku lama)
+        self.processing_mode = processing_mode or Config.EDIT_PROCESSING_MODE
+        self.proxy_max_side = proxy_max_side or Config.EDIT_PROXY_MAX_SIDE
+
+        # Pool graph MediaPipe: setiap request meminjam satu pasang graph
+        # (graph MediaPipe tidak aman dipakai bersamaan oleh beberapa thread)
+        self.graphs = ResourcePool(
+            MediaPipeGraphs,
+            size=graph_pool_size or Config.EDIT_GRAPH_POOL_SIZE,
+            name="mediapipe",
+            # Jika edit dijalankan di worker process, proses web tidak perlu memuat graph
+            lazy=Config.IMAGE_WORKERS > 0
+        )
+
+    def stats(self):
+        return {
+            "processing_mode": self.processing_mode,
+            "graph_pool": self.graphs.stats()
+        }
+
     # --- Utility: decode base64 → cv2 image ---
     def decode_image(self, base64_string):
         try:
@@ -38,27 +136,61 @@ class EditService:
         except:
             return ""
 
+    # --- Context analisis wajah untuk satu gambar (dipakai ulang antar edit) ---
+    def analysis_context(self, image):
+        proxy = self.proxy_max_side if self.processing_mode == 'proxy' else 0
+        return FaceAnalysisContext(self, image, proxy_max_side=proxy)
+
+    # --- Jalankan beberapa edit berurutan dengan satu context analisis ---
+    def apply_edits(self, image, edits):
+        return self.run_pipeline(image, edits)[0]
+
+    # --- Pipeline in-memory: semua edit + durasi per tahap ---
+    def run_pipeline(self, image, operations):
+        ctx = self.analysis_context(image)
+        stages = []
+
+        for op in operations:
+            # Terima 'type' (pipeline) maupun 'edit_type' (format edit-style)
+            edit_type = op.get('type') or op.get('edit_type')
+            value = op.get('value')
+
+            start = time.perf_counter()
+            if edit_type == 'color':
+                image = self.apply_hair_color(image, value, ctx)
+            else:
+                image = self.apply_overlay(image, edit_type, value, ctx)
+            ctx.update(image)
+
+            stages.append({
+                "type": edit_type,
+                "value": value,
+                "ms": round((time.perf_counter() - start) * 1000, 2)
+            })
+
+        return image, {"stages": stages, "analysis": ctx.timings}
+
     # --- 1. GANTI WARNA RAMBUT SECARA NATURAL (via HSV + Masking) ---
-    def apply_hair_color(self, image, hex_color):
+    def apply_hair_color(self, image, hex_color, ctx=None):
         try:
+            ctx = ctx or self.analysis_context(image)
+
             # Konversi hex → RGB → BGR (OpenCV default)
             hex_color = hex_color.lstrip('#')
             rgb = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
             target_bgr = np.array([rgb[2], rgb[1], rgb[0]], dtype=np.uint8)
 
-            img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             h, w, _ = image.shape
 
-            # Segmentasi tubuh (mask tubuh)
-            seg_results = self.segment.process(img_rgb)
-            body_mask = seg_results.segmentation_mask > 0.4
+            # Segmentasi tubuh (mask tubuh) di resolusi analisis (penuh / proxy)
+            body_mask = ctx.segmentation_mask > 0.4
+            ph, pw = body_mask.shape[:2]
 
             # Face mesh untuk membuat perisai wajah (agar warna tidak kena muka/baju)
-            face_results = self.face_mesh.process(img_rgb)
-            face_shield = np.zeros((h, w), dtype=np.uint8)
+            landmarks = ctx.landmarks
+            face_shield = np.zeros((ph, pw), dtype=np.uint8)
             
-            if face_results.multi_face_landmarks:
-                landmarks = face_results.multi_face_landmarks[0].landmark
+            if landmarks:
                 
                 # Outline wajah (menghindari alis, mata, kulit, baju)
                 face_outline = [
@@ -68,54 +200,71 @@ class EditService:
                     93, 234, 127, 162, 21, 54, 103, 67, 109
                 ]
 
-                pts = np.array([[landmarks[idx].x * w, landmarks[idx].y * h] for idx in face_outline], np.int32)
+                pts = np.array([[landmarks[idx].x * pw, landmarks[idx].y * ph] for idx in face_outline], np.int32)
                 cv2.fillPoly(face_shield, [pts], 255)
 
                 # Tutup area bawah agar baju tidak kena
-                chin_y = int(landmarks[152].y * h)
-                face_shield[chin_y:h, :] = 255
+                chin_y = int(landmarks[152].y * ph)
+                face_shield[chin_y:ph, :] = 255
 
             # Rambut = tubuh - wajah/baju
             hair_mask = np.logical_and(body_mask, np.logical_not(face_shield > 0))
 
+            # Kernel blur 15x15 di resolusi penuh, disesuaikan untuk mask proxy
+            sy, sx = h / ph, w / pw
+            k = 15 if pw == w else max(3, int(round(15 / sx)) | 1)
+
+            # Semua proses berikutnya hanya di area rambut (+ margin blur)
+            bbox = mask_bbox(hair_mask, pad=k - 1)
+            if bbox is None:
+                return image
+            py0, py1, px0, px1 = bbox
+            small_mask = hair_mask[py0:py1, px0:px1].astype(np.uint8) * 255
+
+            # Soft blending agar transisi rambut → kulit lebih halus
+            alpha = cv2.GaussianBlur(small_mask, (k, k), 0)
+
+            # Petakan ROI ke resolusi penuh; mask proxy di-upsample hanya di ROI
+            y0, y1 = int(round(py0 * sy)), min(h, int(round(py1 * sy)))
+            x0, x1 = int(round(px0 * sx)), min(w, int(round(px1 * sx)))
+            roi = image[y0:y1, x0:x1]
+            if (y1 - y0, x1 - x0) != small_mask.shape:
+                size = (x1 - x0, y1 - y0)
+                alpha = cv2.resize(alpha, size, interpolation=cv2.INTER_LINEAR)
+                small_mask = cv2.resize(small_mask, size, interpolation=cv2.INTER_LINEAR)
+            roi_mask = small_mask > 127
+
             # Gunakan HSV agar highlight & tekstur rambut tidak hilang
-            hsv_img = cv2.cvtColor(image, cv2.COLOR_BGR2HSV).astype(np.float32)
+            hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
             target_hsv = cv2.cvtColor(np.full((1,1,3), target_bgr, dtype=np.uint8), cv2.COLOR_BGR2HSV)[0][0]
 
             # H = hue (ubah warna), S = saturation (atur vividness)
-            hsv_img[hair_mask, 0] = target_hsv[0]
-            hsv_img[hair_mask, 1] = target_hsv[1] * 0.7
+            hsv_roi[roi_mask, 0] = target_hsv[0]
+            hsv_roi[roi_mask, 1] = int(target_hsv[1] * 0.7)
 
-            colored_img = cv2.cvtColor(hsv_img.astype(np.uint8), cv2.COLOR_HSV2BGR)
+            colored_roi = cv2.cvtColor(hsv_roi, cv2.COLOR_HSV2BGR)
 
-            # Soft blending agar transisi rambut → kulit lebih halus
-            mask_float = hair_mask.astype(float)
-            mask_float = cv2.GaussianBlur(mask_float, (15, 15), 0)
-            
-            for c in range(3):
-                image[:, :, c] = image[:, :, c] * (1 - mask_float) + colored_img[:, :, c] * mask_float
+            # Blend langsung ke ROI gambar (view, in-place)
+            blend_masked(roi, colored_roi, alpha, out=roi, bbox=(0, y1 - y0, 0, x1 - x0))
 
-            return image.astype(np.uint8)
+            return image
 
         except:
             return image
 
     # --- 2. TEMPEL RAMBUT/HIJAB/KACAMATA DENGAN ROTASI & SKALA PRESISI ---
-    def apply_overlay(self, image, category, asset_name):
+    def apply_overlay(self, image, category, asset_name, ctx=None):
         try:
-            # Baca asset PNG yang sudah ada alpha channel
-            asset_path = os.path.join('assets', category, f"{asset_name}.png")
-            overlay = cv2.imread(asset_path, cv2.IMREAD_UNCHANGED)
-            if overlay is None:
+            # Asset PNG sudah dimuat di registry saat startup
+            if asset_registry.get(category, asset_name) is None:
                 return image
 
             h_img, w_img, _ = image.shape
-            results = self.face_mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            if not results.multi_face_landmarks:
+            ctx = ctx or self.analysis_context(image)
+            landmarks = ctx.landmarks
+            if not landmarks:
                 return image
 
-            landmarks = results.multi_face_landmarks[0].landmark
-
             # Hitung rotasi kepala berdasarkan kedua mata
             p_left_eye = landmarks[33]
             p_right_eye = landmarks[263]
@@ -137,14 +286,13 @@ class EditService:
                 scale = 0.9
 
             w_new = int(face_width * scale)
-            h_new = int(w_new * overlay.shape[0] / overlay.shape[1])
-
-            # Rotasi stiker mengikuti rotasi kepala
-            M = cv2.getRotationMatrix2D((overlay.shape[1]/2, overlay.shape[0]/2), -angle, 1)
-            rotated = cv2.warpAffine(overlay, M, (overlay.shape[1], overlay.shape[0]), flags=cv2.INTER_CUBIC)
 
-            # Resize stiker
-            resized = cv2.resize(rotated, (w_new, h_new))
+            # Stiker sudah di-resize & dirotasi mengikuti kepala (premultiplied BGRA),
+            # diambil dari cache registry jika ukuran & sudutnya pernah dipakai
+            resized = asset_registry.get_transformed(category, asset_name, w_new, angle)
+            if resized is None:
+                return image
+            h_new = resized.shape[0]
 
             # Anchor point:
             # rambut/hijab → dahi (id landmark 10)
@@ -157,7 +305,7 @@ class EditService:
             y_off = int(h_new * 0.48) if category != 'glasses' else int(h_new / 2)
             y1 = cy - y_off
 
-            return self.soft_alpha_blend(image, resized, x1, y1)
+            return self.premultiplied_blend(image, resized, x1, y1)
 
         except:
             return image
@@ -180,11 +328,14 @@ class EditService:
         sticker = overlay[oy_s:oy_e, ox_s:ox_e]
 
         # Channel alpha PNG → transisi halus
-        alpha = sticker[:, :, 3] / 255.0
-        alpha = cv2.GaussianBlur(alpha, (3, 3), 0)
-        
-        for c in range(3):
-            region[:, :, c] = alpha * sticker[:, :, c] + (1 - alpha) * region[:, :, c]
+        alpha = cv2.GaussianBlur(sticker[:, :, 3], (3, 3), 0)
 
-        background[y_s:y_e, x_s:x_e] = region
+        # Blend 3 channel sekaligus langsung ke region (view, in-place)
+        blend_masked(region, sticker[:, :, :3], alpha, out=region)
         return background
+
+    # --- 4. Blend stiker premultiplied-alpha (dari AssetRegistry) ---
+    def premultiplied_blend(self, background, overlay, x, y):
+        return blend_premultiplied(background, overlay, x, y)
+
+edit_service = EditService()
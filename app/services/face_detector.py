@@ -0,0 +1,159 @@
+import os
+import threading
+import cv2
+from config import Config
+
+
+# ==============================================================================
+# FACE DETECTOR: dimuat sekali per worker, instance per-thread
+# ==============================================================================
+# Semua backend mengembalikan list kotak (x, y, w, h) dalam koordinat gambar input.
+
+class HaarFaceDetector:
+    """Haar Cascade bawaan OpenCV (backend default, perilaku lama)."""
+
+    name = "haar"
+
+    def __init__(self, scale_factor=1.3, min_neighbors=5):
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.cascade_file = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        self._local = threading.local()
+
+    def _cascade(self):
+        # CascadeClassifier tidak thread-safe → satu instance per thread,
+        # XML hanya di-parse sekali untuk setiap thread
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_file)
+            self._local.cascade = cascade
+        return cascade
+
+    def detect(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        faces = self._cascade().detectMultiScale(gray, self.scale_factor, self.min_neighbors)
+        return [tuple(int(v) for v in face) for face in faces]
+
+
+class YuNetFaceDetector:
+    """OpenCV DNN YuNet (cv2.FaceDetectorYN), dijalankan pada gambar yang diperkecil."""
+
+    name = "yunet"
+
+    def __init__(self, model_file, detect_size=320, score_threshold=0.8):
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"Model YuNet tidak ditemukan: {model_file}")
+        self.model_file = model_file
+        self.detect_size = detect_size
+        self.score_threshold = score_threshold
+        self._local = threading.local()
+
+    def _detector(self):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = cv2.FaceDetectorYN.create(
+                self.model_file, "", (self.detect_size, self.detect_size),
+                self.score_threshold
+            )
+            self._local.detector = detector
+        return detector
+
+    def detect(self, img):
+        h, w = img.shape[:2]
+        scale = min(1.0, self.detect_size / max(h, w))
+        small = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) \
+            if scale < 1.0 else img
+
+        detector = self._detector()
+        detector.setInputSize((small.shape[1], small.shape[0]))
+        _, faces = detector.detect(small)
+        if faces is None:
+            return []
+
+        # Kembalikan ke koordinat gambar asli
+        return [
+            tuple(int(round(v / scale)) for v in face[:4])
+            for face in faces
+        ]
+
+
+class MediaPipeFaceDetector:
+    """MediaPipe Face Detection (BlazeFace), input diperkecil ke `detect_size`."""
+
+    name = "mediapipe"
+
+    def __init__(self, detect_size=320, min_confidence=0.5):
+        import mediapipe as mp
+        self.mp_face_detection = mp.solutions.face_detection
+        self.detect_size = detect_size
+        self.min_confidence = min_confidence
+        self._local = threading.local()
+
+    def _detector(self):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self.mp_face_detection.FaceDetection(
+                model_selection=1, min_detection_confidence=self.min_confidence
+            )
+            self._local.detector = detector
+        return detector
+
+    def detect(self, img):
+        h, w = img.shape[:2]
+        scale = min(1.0, self.detect_size / max(h, w))
+        small = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) \
+            if scale < 1.0 else img
+
+        results = self._detector().process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        if not results.detections:
+            return []
+
+        # Bounding box MediaPipe relatif (0..1) → langsung ke piksel gambar asli
+        faces = []
+        for detection in results.detections:
+            box = detection.location_data.relative_bounding_box
+            faces.append((
+                int(box.xmin * w), int(box.ymin * h),
+                int(box.width * w), int(box.height * h)
+            ))
+        return faces
+
+
+def detect_bounded(detector, img, max_side):
+    """
+    Deteksi pada salinan gambar yang diperkecil (sisi terpanjang ≤ max_side),
+    lalu petakan kotak wajah kembali ke koordinat resolusi penuh.
+    Waktu deteksi jadi hampir tidak tergantung ukuran upload.
+    """
+    h, w = img.shape[:2]
+    if not max_side or max(h, w) <= max_side:
+        return detector.detect(img)
+
+    scale = max_side / max(h, w)
+    small = cv2.resize(
+        img, (max(1, round(w * scale)), max(1, round(h * scale))),
+        interpolation=cv2.INTER_AREA
+    )
+
+    faces = []
+    for (x, y, fw, fh) in detector.detect(small):
+        x1, y1 = int(x / scale), int(y / scale)
+        faces.append((
+            x1, y1,
+            min(w - x1, int(round(fw / scale))),
+            min(h - y1, int(round(fh / scale)))
+        ))
+    return faces
+
+
+def create_face_detector(backend=None):
+    """Buat detector sesuai konfigurasi, fallback ke Haar jika backend gagal dimuat."""
+    backend = (backend or Config.FACE_DETECTOR_BACKEND).lower()
+    try:
+        if backend == 'yunet':
+            return YuNetFaceDetector(Config.FACE_DETECTOR_YUNET_MODEL, Config.FACE_DETECTOR_SIZE)
+        if backend == 'mediapipe':
+            return MediaPipeFaceDetector(Config.FACE_DETECTOR_SIZE)
+    except Exception as e:
+        print(f"⚠️ Face detector '{backend}' gagal dimuat ({e}), memakai Haar Cascade")
+    return HaarFaceDetector()
@@ -0,0 +1,98 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from app.extensions import db
+from app.services.aggregates import aggregates
+from app.services.blob_store import blob_store
+from app.services.history_images import history_image_keys
+from app.services.job_store import JobStore
+
+
+# ==============================================================================
+# HAPUS SEMUA HISTORY USER (MASSAL)
+# ==============================================================================
+# Query hanya mengambil ID + key blob (tanpa payload gambar), lalu dokumen
+# dihapus per WriteBatch (maks 500 operasi, termasuk 1 operasi counter
+# dashboard) dengan beberapa batch berjalan paralel. Bisa dijalankan langsung
+# atau sebagai job background yang melaporkan progres lewat JobStore.
+
+MAX_BATCH_OPS = 500
+
+
+class HistoryClearRunner:
+    def __init__(self, db, store, batch_size=500, parallelism=4, max_jobs=2):
+        self.db = db
+        self.store = store
+        # Satu slot batch dipakai untuk update counter dashboard
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_OPS) - 1)
+        self.parallelism = max(1, parallelism)
+        self._jobs = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="history-clear")
+
+    def clear(self, email, on_progress=None):
+        """Hapus semua history milik `email`; return jumlah dokumen terhapus."""
+        docs = self.db.collection('style_history') \
+                   .where('userId', '==', email) \
+                   .select(['image_key', 'thumb_key']) \
+                   .get()
+
+        chunks = [docs[i:i + self.batch_size] for i in range(0, len(docs), self.batch_size)]
+        total, deleted = len(docs), 0
+        lock = threading.Lock()
+        if on_progress:
+            on_progress(0, total)
+
+        def delete_chunk(chunk):
+            nonlocal deleted
+            batch = self.db.batch()
+            for doc in chunk:
+                batch.delete(doc.reference)
+            aggregates.stage_count(batch, 'styles', -len(chunk))
+            batch.commit()
+
+            # Blob gambar chunk ini dihapus sekaligus setelah dokumennya hilang
+            blob_store.delete_many(
+                key for doc in chunk for key in history_image_keys(doc.to_dict())
+            )
+
+            with lock:
+                deleted += len(chunk)
+                if on_progress:
+                    on_progress(deleted, total)
+
+        if len(chunks) <= 1:
+            for chunk in chunks:
+                delete_chunk(chunk)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.parallelism, len(chunks))) as pool:
+                # list() → error dari batch mana pun diteruskan ke pemanggil
+                list(pool.map(delete_chunk, chunks))
+        return deleted
+
+    # --- Mode background ---
+    def submit(self, email):
+        job = self.store.create("history_clear", user_id=email, deleted=0, total=None)
+        self._jobs.submit(self._run, job["id"], email)
+        return job
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _run(self, job_id, email):
+        try:
+            self.store.update(job_id, state="running")
+            deleted = self.clear(
+                email, on_progress=lambda done, total: self.store.update(job_id, deleted=done, total=total)
+            )
+            self.store.update(job_id, state="done", deleted=deleted)
+        except Exception as e:
+            traceback.print_exc()
+            self.store.update(job_id, state="failed", error=str(e))
+
+
+history_clear = HistoryClearRunner(
+    db,
+    JobStore(max_size=256, ttl=600),   # status job disimpan 10 menit
+    batch_size=Config.HISTORY_DELETE_BATCH_SIZE,
+    parallelism=Config.HISTORY_DELETE_PARALLELISM
+)
@@ -0,0 +1,54 @@
+import uuid
+from config import Config
+from app.services.blob_store import blob_store
+from app.services.image_workers import image_workers
+
+
+# ==============================================================================
+# GAMBAR HISTORY DI BLOB STORAGE (full + thumbnail)
+# ==============================================================================
+# Dokumen style_history menyimpan `image_key` & `thumb_key`; gambar penuh
+# diambil lazy lewat GET /api/history/<id>/image, list cukup thumbnail.
+
+def store_history_images(img_bytes, max_dim=None, width=None, quality=70):
+    """
+    Resize + kompres gambar (sekali decode) lalu upload versi penuh & thumbnail.
+    Return (keys, full_jpeg) atau (None, None) jika bukan gambar.
+    """
+    variants = image_workers.run('image_variants', img_bytes, variants=[
+        {"max_dim": max_dim, "width": width, "quality": quality},
+        {"max_dim": Config.HISTORY_THUMB_MAX_SIDE, "quality": Config.HISTORY_THUMB_QUALITY}
+    ])
+    if variants is None:
+        return None, None
+
+    full, thumb = variants
+    keys = upload_history_images(full, thumb)
+    return keys, full
+
+
+def upload_history_images(full, thumb):
+    base = f"history/{uuid.uuid4().hex}"
+    keys = {"image_key": f"{base}.jpg", "thumb_key": f"{base}_thumb.jpg"}
+    blob_store.put(keys["image_key"], full)
+    blob_store.put(keys["thumb_key"], thumb)
+    return keys
+
+
+def history_image_keys(data):
+    return [data[field] for field in ("image_key", "thumb_key") if data.get(field)]
+
+
+def delete_history_images(data):
+    for key in history_image_keys(data):
+        blob_store.delete(key)
+
+
+def with_image_urls(doc_id, data):
+    """
+    Tambahkan URL gambar lazy. Endpoint-nya juga melayani dokumen lama
+    (data URI inline), jadi URL selalu ada walau dokumen belum dimigrasi.
+    """
+    data['image_url'] = f"/api/history/{doc_id}/image"
+    data['thumbnail_url'] = f"/api/history/{doc_id}/thumbnail"
+    return data
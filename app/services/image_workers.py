@@ -0,0 +1,230 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from multiprocessing.shared_memory import SharedMemory
+import cv2
+import numpy as np
+from config import Config
+from app.utils.image_io import upload_size, read_into
+from app.utils.metrics import LatencyRecorder
+
+
+# ==============================================================================
+# WORKER PROCESS UNTUK PEKERJAAN GAMBAR BERAT (CPU-bound)
+# ==============================================================================
+# Decode, deteksi, inferensi, edit MediaPipe & encode dijalankan di proses
+# terpisah agar tidak memblokir worker Flask/Socket.IO. Input gambar dikirim
+# lewat shared memory (bukan bytes yang di-pickle). Antrian dibatasi: jika
+# penuh, pemanggil mendapat WorkerPoolSaturated → route membalas 503.
+
+class WorkerPoolSaturated(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Server sedang sibuk memproses gambar, coba lagi")
+        self.retry_after = retry_after
+
+
+# --- Job (dijalankan di worker, atau inline jika pool nonaktif) ---
+def job_analyze_face(buf):
+    from app.services.ai_service import ai_service
+    return ai_service._analyze_face(buf)
+
+
+def job_edit_pipeline(buf, operations, quality=90, fmt='jpeg'):
+    from app.services.edit_service import edit_service
+
+    # Decode sekali di awal
+    start = time.perf_counter()
+    img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    decode_ms = round((time.perf_counter() - start) * 1000, 2)
+    if img is None:
+        return None, None
+
+    # Semua operasi dijalankan in-memory
+    result_img, timings = edit_service.run_pipeline(img, operations)
+
+    # Encode sekali di akhir (hanya satu kali kompresi JPEG/WebP)
+    start = time.perf_counter()
+    if fmt == 'webp':
+        _, encoded = cv2.imencode('.webp', result_img, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    else:
+        _, encoded = cv2.imencode('.jpg', result_img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    timings.update({
+        "decode_ms": decode_ms,
+        "encode_ms": round((time.perf_counter() - start) * 1000, 2)
+    })
+    return encoded.tobytes(), timings
+
+
+def _resize_encode(img, max_dim=None, width=None, quality=70):
+    h, w = img.shape[:2]
+    if width:
+        # Lebar tetap (tinggi mengikuti rasio)
+        img = cv2.resize(img, (width, int(h * (width / w))))
+    elif max_dim and max(h, w) > max_dim:
+        scale = max_dim / max(h, w)
+        img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    _, encoded = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return encoded.tobytes()
+
+
+def job_thumbnail(buf, max_dim=None, width=None, quality=70):
+    img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    return _resize_encode(img, max_dim, width, quality)
+
+
+def job_image_variants(buf, variants):
+    # Satu kali decode untuk beberapa ukuran (mis. gambar penuh + thumbnail)
+    img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    return [_resize_encode(img, **variant) for variant in variants]
+
+
+JOBS = {
+    'analyze_face': job_analyze_face,
+    'edit_pipeline': job_edit_pipeline,
+    'thumbnail': job_thumbnail,
+    'image_variants': job_image_variants,
+}
+
+
+# --- Sisi worker ---
+def _init_worker():
+    # Di dalam worker: satu interpreter & satu graph MediaPipe cukup,
+    # tanpa jendela micro-batch (satu job = satu gambar). Override harus
+    # terjadi sebelum ai_service/edit_service pertama kali di-import, karena
+    # pool-nya dibangun saat import (lihat run.py & app/__init__.py)
+    Config.IMAGE_WORKERS = 0
+    Config.AI_INTERPRETER_POOL_SIZE = 1
+    Config.EDIT_GRAPH_POOL_SIZE = 1
+
+    from app.services.ai_service import ai_service
+    from app.services.edit_service import edit_service
+
+    # Muat model sekali per worker
+    if ai_service.engine is not None:
+        ai_service.engine.window = 0.0
+        with ai_service.pool.checkout():
+            pass
+    with edit_service.graphs.checkout():
+        pass
+
+
+def _run_job(job, shm_name, size, params):
+    # Segment milik proses utama (worker berbagi resource tracker yang sama,
+    # jadi unlink tetap hanya dilakukan oleh proses utama)
+    shm = SharedMemory(name=shm_name)
+    buf = np.ndarray((size,), dtype=np.uint8, buffer=shm.buf)
+    try:
+        return JOBS[job](buf, **params)
+    finally:
+        del buf
+        try:
+            shm.close()
+        except BufferError:
+            # Masih ada view ke buffer (mis. dari traceback); dilepas saat GC
+            pass
+
+
+# --- Sisi proses web ---
+class ImageWorkerPool:
+    def __init__(self, num_workers=0, max_pending=None, timeout=60, retry_after=2):
+        self.num_workers = max(0, int(num_workers))
+        self.max_pending = max_pending or max(1, self.num_workers * 4)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.rejected = 0
+        self.job_times = LatencyRecorder()
+
+    @property
+    def enabled(self):
+        return self.num_workers > 0
+
+    def _get_executor(self):
+        # Dibuat saat job pertama (proses worker sendiri tidak pernah membuatnya)
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.num_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker
+                    )
+        return self._executor
+
+    def run(self, job, data, **params):
+        """Jalankan job untuk gambar dalam bentuk bytes."""
+        view = np.frombuffer(data, np.uint8)
+        if not self.enabled:
+            # Inline: job cukup membaca view bytes, tanpa salinan buffer
+            return JOBS[job](view, **params)
+
+        def fill(buffer):
+            buffer[:len(view)] = view
+        return self._run(job, len(view), fill, params)
+
+    def run_upload(self, job, file, **params):
+        """
+        Jalankan job langsung dari file upload (FileStorage): isi stream dibaca
+        ke buffer numpy / shared memory tanpa salinan bytes perantara.
+        """
+        size = upload_size(file)
+        return self._run(job, size, lambda buffer: read_into(file, buffer), params)
+
+    def _run(self, job, size, fill, params):
+        if not self.enabled:
+            buf = np.empty(size, np.uint8)
+            fill(buf)
+            return JOBS[job](buf, **params)
+
+        # Backpressure: tolak langsung jika antrian penuh
+        if not self._slots.acquire(blocking=False):
+            with self._pending_lock:
+                self.rejected += 1
+            raise WorkerPoolSaturated(self.retry_after)
+
+        start = time.perf_counter()
+        with self._pending_lock:
+            self._pending += 1
+        shm = SharedMemory(create=True, size=max(1, size))
+        try:
+            fill(np.ndarray((size,), dtype=np.uint8, buffer=shm.buf))
+            future = self._get_executor().submit(_run_job, job, shm.name, size, params)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                future.cancel()
+                raise TimeoutError(f"Job gambar '{job}' melebihi {self.timeout} detik")
+        finally:
+            shm.close()
+            shm.unlink()
+            with self._pending_lock:
+                self._pending -= 1
+            self._slots.release()
+            self.job_times.record((time.perf_counter() - start) * 1000)
+
+    def stats(self):
+        return {
+            "workers": self.num_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "job_ms": self.job_times.snapshot()
+        }
+
+
+image_workers = ImageWorkerPool(
+    num_workers=Config.IMAGE_WORKERS,
+    max_pending=Config.IMAGE_QUEUE_MAX,
+    timeout=Config.IMAGE_JOB_TIMEOUT,
+    retry_after=Config.IMAGE_RETRY_AFTER
+)
@@ -0,0 +1,92 @@
+import threading
+import time
+import uuid
+from app.utils.cache import TTLCache
+
+
+# ==============================================================================
+# JOB STORE LOKAL (status pekerjaan background)
+# ==============================================================================
+# Menyimpan state job di memori proses (LRU + TTL). Setiap perubahan state
+# diteruskan ke listener (mis. push Socket.IO) dan membangunkan pemanggil
+# yang menunggu lewat wait().
+
+FINAL_STATES = ('done', 'failed')
+
+
+class JobStore:
+    def __init__(self, max_size=1024, ttl=600):
+        self.ttl = ttl
+        self._jobs = TTLCache(max_size=max_size, ttl=ttl)
+        self._cond = threading.Condition()
+        self._listeners = []
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def create(self, kind, **fields):
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "state": "queued",
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            **fields
+        }
+        self._jobs.set(job["id"], job)
+        self._notify(job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields, updated_at=time.time())
+            self._cond.notify_all()
+        self._notify(job)
+        return job
+
+    def wait(self, job_id, timeout=None):
+        """Blok sampai job selesai (done/failed) atau timeout; return job terakhir."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job["state"] in FINAL_STATES:
+                    return job
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return job
+                self._cond.wait(remaining)
+
+    def wait_any(self, job_ids, timeout=None):
+        """Blok sampai minimal satu job di `job_ids` selesai; return list id yang sudah selesai."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                finished = []
+                for job_id in job_ids:
+                    job = self._jobs.get(job_id)
+                    if job is None or job["state"] in FINAL_STATES:
+                        finished.append(job_id)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if finished or (remaining is not None and remaining <= 0):
+                    return finished
+                self._cond.wait(remaining)
+
+    def _notify(self, job):
+        for fn in self._listeners:
+            try:
+                fn(job)
+            except Exception as e:
+                print(f"⚠️ Job listener error: {e}")
+
+    def stats(self):
+        return self._jobs.stats()
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import threading
+import time
+from app.utils.cache import TTLCache
+
+
+# ==============================================================================
+# CACHE HASIL GENERATE LIGHTX (content-addressed)
+# ==============================================================================
+# Key = sha256(hash gambar + prompt final). Pasangan (foto, style) yang sama
+# tidak dikirim ulang ke LightX (berbayar & 5–15 detik). Tier 1: LRU
+# in-memory. Tier 2 (opsional): file JPEG di disk yang bertahan saat restart.
+
+def result_key(img_hash, prompt):
+    return hashlib.sha256(f"{img_hash}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+class LightXResultCache:
+    def __init__(self, max_size=64, ttl=3600, disk_dir=None, disk_ttl=7 * 24 * 3600):
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk_dir = disk_dir or None
+        self.disk_ttl = disk_ttl
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.jpg")
+
+    def get(self, key):
+        content = self.memory.get(key)
+        if content is not None:
+            return content
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                if self.disk_ttl and time.time() - os.stat(path).st_mtime > self.disk_ttl:
+                    os.remove(path)
+                    raise OSError("kadaluarsa")
+                with open(path, 'rb') as f:
+                    content = f.read()
+                self.disk_hits += 1
+                self.memory.set(key, content)
+                return content
+            except OSError:
+                self.disk_misses += 1
+        return None
+
+    def set(self, key, content):
+        self.memory.set(key, content)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Tulis ke file sementara lalu rename agar atomik
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ Gagal menulis cache LightX ke disk: {e}")
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "disk": {
+                "enabled": bool(self.disk_dir),
+                "hits": self.disk_hits,
+                "misses": self.disk_misses
+            }
+        }
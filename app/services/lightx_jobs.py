@@ -0,0 +1,330 @@
+import base64
+import heapq
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from app.services import lightx_service
+from app.services.analysis_cache import content_hash
+from app.services.job_store import JobStore, FINAL_STATES
+from app.services.lightx_cache import LightXResultCache, result_key
+from app.utils.cache import TTLCache
+
+
+def to_data_uri(content):
+    """Bytes JPEG hasil job → data URI (untuk endpoint JSON lama)."""
+    result_b64 = base64.b64encode(content).decode('utf-8')
+    return f"data:image/jpeg;base64,{result_b64}"
+
+
+# ==============================================================================
+# JOB GENERATE HAIRSTYLE LIGHTX (NON-BLOCKING)
+# ==============================================================================
+# submit() langsung mengembalikan job; upload + order dijalankan di thread
+# pool kecil, lalu polling status dijadwalkan oleh SATU thread scheduler
+# (heap waktu-cek berikutnya) tanpa time.sleep() per request. Tidak ada
+# worker Flask yang tertahan selama LightX memproses gambar. Jeda antar cek
+# mengikuti AdaptivePollSchedule per kategori prompt, dibatasi deadline.
+# Hasil disimpan di LightXResultCache; request (gambar, prompt) yang sama
+# saat order masih berjalan ikut menunggu job yang sama (coalescing).
+# Batch: satu upload untuk banyak style, order dijalankan paralel dengan batas
+# jumlah order aktif per batch, semuanya dipoll oleh scheduler yang sama.
+
+class LightXJobRunner:
+    def __init__(self, store, schedule, cache, max_workers=8, batch_concurrency=4):
+        self.store = store
+        self.schedule = schedule
+        self.cache = cache
+        self.batch_concurrency = batch_concurrency
+        self._batches = TTLCache(max_size=256, ttl=store.ttl)   # untuk GET status batch
+        self._active_batches = {}    # batch_id → batch yang masih punya order berjalan/antri
+        self._batch_lock = threading.Lock()
+        self._inflight = {}          # cache_key → job_id yang sedang berjalan
+        self._inflight_lock = threading.Lock()
+        self.coalesced = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lightx")
+        self._schedule = []          # heap (waktu_cek, urutan, job_id)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    # --- API publik ---
+    def submit(self, image_bytes, prompt, category="custom", **fields):
+        job, is_new = self._create_job(content_hash(image_bytes), prompt, category, **fields)
+        if is_new:
+            self._executor.submit(self._start, job["id"], image_bytes, prompt)
+        return job
+
+    def submit_batch(self, image_bytes, items, concurrency=None):
+        """
+        `items` = list dict {prompt, category, style}. Return (batch, jobs);
+        gambar diupload sekali, lalu order dijalankan paralel (maks `concurrency`).
+        """
+        img_hash = content_hash(image_bytes)
+        batch = {
+            "id": uuid.uuid4().hex,
+            "job_ids": [],
+            "pending": deque(),
+            "active": 0,
+            "limit": concurrency or self.batch_concurrency,
+            "image_url": None
+        }
+
+        jobs = []
+        for item in items:
+            job, is_new = self._create_job(
+                img_hash, item["prompt"], item.get("category", "custom"),
+                batch_id=batch["id"], style=item.get("style")
+            )
+            jobs.append(job)
+            batch["job_ids"].append(job["id"])
+            if is_new:
+                batch["pending"].append(job["id"])
+
+        self._batches.set(batch["id"], batch)
+        if batch["pending"]:
+            # Batch aktif disimpan di dict biasa (tidak ikut tergusur LRU)
+            with self._batch_lock:
+                self._active_batches[batch["id"]] = batch
+            self._executor.submit(self._start_batch, batch["id"], image_bytes)
+        return batch, jobs
+
+    def get_batch(self, batch_id):
+        with self._batch_lock:
+            batch = self._active_batches.get(batch_id)
+        return batch or self._batches.get(batch_id)
+
+    def _create_job(self, img_hash, prompt, category, batch_id=None, **fields):
+        """Return (job, is_new). is_new=False jika dari cache atau ikut job yang berjalan."""
+        cache_key = result_key(img_hash, prompt)
+        batch_ids = [batch_id] if batch_id else []
+
+        # Sudah pernah digenerate → job langsung selesai tanpa panggil LightX
+        job = self._cached_job(cache_key, prompt, category, batch_ids, fields)
+        if job is not None:
+            return job, False
+
+        with self._inflight_lock:
+            # Order yang sama masih berjalan → pakai job itu (satu order LightX)
+            job = self.store.get(self._inflight.get(cache_key))
+            if job is not None and job["state"] not in FINAL_STATES:
+                self.coalesced += 1
+                if batch_id:
+                    self.store.update(job["id"], batch_ids=job["batch_ids"] + [batch_id])
+                return job, False
+
+            # Job yang sama bisa saja baru selesai sejak cek cache di atas
+            job = self._cached_job(cache_key, prompt, category, batch_ids, fields)
+            if job is not None:
+                return job, False
+
+            job = self.store.create(
+                "lightx_hairstyle", prompt=prompt, category=category, polls=0,
+                cache_key=cache_key, cached=False, batch_id=batch_id, batch_ids=batch_ids,
+                **fields
+            )
+            self._inflight[cache_key] = job["id"]
+        return job, True
+
+    def _cached_job(self, cache_key, prompt, category, batch_ids, fields):
+        content = self.cache.get(cache_key)
+        if content is None:
+            return None
+        return self.store.create(
+            "lightx_hairstyle", prompt=prompt, category=category, polls=0,
+            cache_key=cache_key, cached=True, state="done", batch_ids=batch_ids,
+            result=content, **fields
+        )
+
+    def stats(self):
+        with self._cond:
+            scheduled = len(self._schedule)
+        return {
+            "jobs": self.store.stats(),
+            "polling": scheduled,
+            "completion": self.schedule.stats(),
+            "cache": self.cache.stats(),
+            "coalesced": self.coalesced,
+            "batches": len(self._batches),
+            "active_batches": len(self._active_batches),
+            "http": lightx_service.client.stats()
+        }
+
+    # --- Step 1 & 2: upload + buat order (di thread pool) ---
+    def _start(self, job_id, image_bytes, prompt):
+        try:
+            self.store.update(job_id, state="uploading")
+            image_url = lightx_service.upload_image_to_lightx(image_bytes)
+            if not image_url:
+                return self._fail(job_id, "Gagal upload image ke LightX")
+            self._order(job_id, image_url, prompt)
+        except Exception as e:
+            traceback.print_exc()
+            self._fail(job_id, f"Server Error: {str(e)}")
+
+    def _start_batch(self, batch_id, image_bytes):
+        with self._batch_lock:
+            batch = self._active_batches[batch_id]
+        try:
+            for job_id in list(batch["pending"]):
+                self.store.update(job_id, state="uploading")
+            image_url = lightx_service.upload_image_to_lightx(image_bytes)
+        except Exception as e:
+            traceback.print_exc()
+            image_url = None
+
+        if not image_url:
+            with self._batch_lock:
+                pending, batch["pending"] = list(batch["pending"]), deque()
+                self._active_batches.pop(batch_id, None)
+            for job_id in pending:
+                self._fail(job_id, "Gagal upload image ke LightX")
+            return
+
+        batch["image_url"] = image_url
+        self._launch_batch(batch)
+
+    def _launch_batch(self, batch):
+        # Jalankan order berikutnya selama slot batch masih ada
+        with self._batch_lock:
+            launch = []
+            while batch["pending"] and batch["active"] < batch["limit"]:
+                launch.append(batch["pending"].popleft())
+                batch["active"] += 1
+
+        for job_id in launch:
+            job = self.store.update(job_id, batch_slot=True)
+            if job is None:
+                self._batch_job_done(batch["id"])
+                continue
+            self._executor.submit(self._order_safe, job_id, batch["image_url"], job["prompt"])
+
+    def _batch_job_done(self, batch_id):
+        with self._batch_lock:
+            batch = self._active_batches.get(batch_id)
+            if batch is None:
+                return
+            batch["active"] -= 1
+            if not batch["pending"] and batch["active"] == 0:
+                # Semua order batch selesai → lepas dari daftar aktif
+                del self._active_batches[batch_id]
+                return
+        self._launch_batch(batch)
+
+    def _order_safe(self, job_id, image_url, prompt):
+        try:
+            self._order(job_id, image_url, prompt)
+        except Exception as e:
+            traceback.print_exc()
+            self._fail(job_id, f"Server Error: {str(e)}")
+
+    def _order(self, job_id, image_url, prompt):
+        self.store.update(job_id, state="generating")
+        order_id = lightx_service.generate_hairstyle(image_url, prompt)
+        if not order_id:
+            return self._fail(job_id, "Gagal generate hairstyle")
+
+        job = self.store.update(
+            job_id, state="polling", order_id=order_id,
+            ordered_at=time.monotonic(), last_poll_s=0.0
+        )
+        self._schedule_poll(job_id, self.schedule.next_delay(job["category"], 0, 0))
+
+    # --- Step 3: polling status (dijadwalkan, bukan sleep) ---
+    def _schedule_poll(self, job_id, delay):
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._schedule, (time.monotonic() + delay, self._seq, job_id))
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._scheduler_loop, daemon=True)
+                self._thread.start()
+
+    def _scheduler_loop(self):
+        while True:
+            with self._cond:
+                while not self._schedule or self._schedule[0][0] > time.monotonic():
+                    timeout = self._schedule[0][0] - time.monotonic() if self._schedule else None
+                    self._cond.wait(timeout)
+                _, _, job_id = heapq.heappop(self._schedule)
+            # Request HTTP dijalankan di thread pool agar scheduler tidak ikut menunggu
+            self._executor.submit(self._poll, job_id)
+
+    def _poll(self, job_id):
+        try:
+            job = self.store.get(job_id)
+            if job is None:
+                return
+
+            polls = job["polls"] + 1
+            status, output_url = lightx_service.fetch_order_status(job["order_id"])
+            elapsed = time.monotonic() - job["ordered_at"]
+            previous_poll = job["last_poll_s"]
+            self.store.update(job_id, polls=polls, last_poll_s=elapsed)
+
+            if status == 'active':
+                # Waktu selesai order → data untuk menyetel jadwal berikutnya
+                self.schedule.record(job["category"], elapsed, previous_poll=previous_poll)
+                return self._finish(job_id, output_url)
+            if status == 'failed':
+                return self._fail(job_id, "Gagal mendapatkan hasil (generation failed)")
+
+            delay = self.schedule.next_delay(job["category"], elapsed, polls)
+            if delay is None:
+                return self._fail(job_id, "Gagal mendapatkan hasil (timeout)")
+            self._schedule_poll(job_id, delay)
+        except Exception as e:
+            traceback.print_exc()
+            self._fail(job_id, f"Server Error: {str(e)}")
+
+    # --- Download hasil & simpan ke job ---
+    def _finish(self, job_id, output_url):
+        content = lightx_service.download_result(output_url)
+        job = self.store.get(job_id)
+        if job is None:
+            return
+
+        # Isi cache SEBELUM job ditandai done: request yang melihat job ini
+        # sudah final pasti menemukan hasilnya di cache (tidak order ulang)
+        self.cache.set(job["cache_key"], content)
+        job = self.store.update(
+            job_id, state="done", output_url=output_url, result=content
+        )
+        if job is not None:
+            self._release(job)
+        print(f"✅ Job {job_id} selesai")
+
+    def _fail(self, job_id, message):
+        print(f"❌ Job {job_id} gagal: {message}")
+        job = self.store.update(job_id, state="failed", error=message)
+        if job is not None:
+            self._release(job)
+
+    def _release(self, job):
+        with self._inflight_lock:
+            if self._inflight.get(job["cache_key"]) == job["id"]:
+                del self._inflight[job["cache_key"]]
+        # Slot order batch kosong → jalankan style berikutnya
+        if job.get("batch_slot"):
+            self._batch_job_done(job["batch_id"])
+
+
+job_store = JobStore(max_size=Config.LIGHTX_JOB_STORE_SIZE, ttl=Config.LIGHTX_JOB_TTL)
+
+lightx_result_cache = LightXResultCache(
+    max_size=Config.LIGHTX_CACHE_SIZE,
+    ttl=Config.LIGHTX_CACHE_TTL,
+    disk_dir=Config.LIGHTX_CACHE_DIR,
+    disk_ttl=Config.LIGHTX_CACHE_DISK_TTL
+)
+
+lightx_jobs = LightXJobRunner(
+    job_store,
+    lightx_service.poll_schedule,
+    lightx_result_cache,
+    max_workers=Config.LIGHTX_JOB_WORKERS,
+    batch_concurrency=Config.LIGHTX_BATCH_CONCURRENCY
+)
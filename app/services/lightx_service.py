@@ -0,0 +1,335 @@
+import random
+import threading
+import traceback
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from config import Config
+from app.services.poll_schedule import AdaptivePollSchedule
+from app.utils.metrics import LatencyRecorder
+
+# ==============================================================================
+# KONFIGURASI API KEY (LIGHTX V2)
+# ==============================================================================
+LIGHTX_API_KEY = Config.LIGHTX_API_KEY
+
+# LightX API v2 Endpoints (relatif terhadap base_url client)
+UPLOAD_PATH = "/external/api/v2/uploadImageUrl"
+HAIRSTYLE_PATH = "/external/api/v2/hairstyle"
+STATUS_PATH = "/external/api/v2/order-status"
+
+
+# ==============================================================================
+# HTTP CLIENT BERSAMA (keep-alive, timeout per endpoint, retry + backoff)
+# ==============================================================================
+class LightXClient:
+    # (connect, read) timeout per langkah, dalam detik
+    TIMEOUTS = {
+        "upload_url": 15,
+        "s3_put": 60,
+        "order": 30,
+        "status": 10,
+        "download": 30,
+    }
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    # Membuat order tidak idempotent: hanya diulang jika jelas belum diproses
+    NON_IDEMPOTENT_RETRY_STATUSES = (429, 503)
+
+    def __init__(self, base_url, api_key, session=None, pool_size=16, connect_timeout=5,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Satu Session = koneksi TCP/TLS dipakai ulang (termasuk ke host S3)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+        self.latency = {step: LatencyRecorder() for step in self.TIMEOUTS}
+        self.retries = {step: 0 for step in self.TIMEOUTS}
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempt, response=None):
+        # Hormati Retry-After dari server (429/503) jika ada
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.backoff_max, float(retry_after))
+        # Exponential backoff dengan full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, step, method, url, idempotent=True, **kwargs):
+        kwargs.setdefault("timeout", (self.connect_timeout, self.TIMEOUTS[step]))
+        retry_statuses = self.RETRY_STATUSES if idempotent else self.NON_IDEMPOTENT_RETRY_STATUSES
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                # Koneksi putus setelah body terkirim juga ConnectionError: hanya
+                # gagal saat connect yang pasti belum sampai ke server
+                if attempt >= self.max_retries or not (idempotent or _failed_to_connect(e)):
+                    raise
+            except requests.Timeout:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+            finally:
+                self.latency[step].record((time.perf_counter() - start) * 1000)
+
+            if response is not None and (
+                response.status_code not in retry_statuses or attempt >= self.max_retries
+            ):
+                return response
+
+            with self._lock:
+                self.retries[step] += 1
+            delay = self._backoff(attempt, response)
+            status = response.status_code if response is not None else "error"
+            print(f"⚠️ LightX {step} {status}, retry {attempt + 1}/{self.max_retries} dalam {delay:.2f}s")
+            time.sleep(delay)
+
+    def stats(self):
+        return {
+            step: {"latency_ms": self.latency[step].snapshot(), "retries": self.retries[step]}
+            for step in self.TIMEOUTS
+        }
+
+    def _headers(self):
+        return {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key
+        }
+
+    # ==========================================================================
+    # LIGHTX V2 - UPLOAD IMAGE
+    # ==========================================================================
+    def upload_image(self, image_bytes):
+        """
+        Step 1: Upload image ke LightX S3, dapat imageUrl
+        """
+        try:
+            # Get image size
+            image_size = len(image_bytes)
+
+            print(f">>> [STEP 1] Uploading image to LightX ({image_size} bytes)...")
+
+            # Request uploadUrl
+            payload = {
+                "uploadType": "imageUrl",
+                "size": image_size,
+                "contentType": "image/jpeg"
+            }
+
+            response = self.request(
+                "upload_url", "POST", self.base_url + UPLOAD_PATH, headers=self._headers(), json=payload
+            )
+
+            if response.status_code != 200:
+                print(f"❌ Upload request failed: {response.text}")
+                return None
+
+            data = response.json()
+
+            if data.get('statusCode') != 2000:
+                print(f"❌ LightX error: {data.get('message')}")
+                return None
+
+            upload_url = data['body']['uploadImage']
+            image_url = data['body']['imageUrl']
+
+            print(f">>> [STEP 1.1] Uploading to S3: {upload_url[:80]}...")
+
+            # Upload image to S3 using PUT
+            put_headers = {"Content-Type": "image/jpeg"}
+            put_response = self.request("s3_put", "PUT", upload_url, headers=put_headers, data=image_bytes)
+
+            if put_response.status_code != 200:
+                print(f"❌ S3 upload failed: {put_response.status_code}")
+                return None
+
+            print(f"✅ Image uploaded! URL: {image_url}")
+            return image_url
+
+        except Exception as e:
+            print(f"❌ Exception during upload: {e}")
+            traceback.print_exc()
+            return None
+
+    # ==========================================================================
+    # LIGHTX V2 - GENERATE HAIRSTYLE
+    # ==========================================================================
+    def create_order(self, image_url, text_prompt):
+        """
+        Step 2: Generate hairstyle, dapat orderId
+        """
+        try:
+            print(f">>> [STEP 2] Generating hairstyle...")
+            print(f">>> Prompt: {text_prompt}")
+
+            payload = {
+                "imageUrl": image_url,
+                "textPrompt": text_prompt
+            }
+
+            response = self.request(
+                "order", "POST", self.base_url + HAIRSTYLE_PATH, idempotent=False,
+                headers=self._headers(), json=payload
+            )
+
+            if response.status_code != 200:
+                print(f"❌ Hairstyle request failed: {response.text}")
+                return None
+
+            data = response.json()
+
+            if data.get('statusCode') != 2000:
+                print(f"❌ LightX error: {data.get('message')}")
+                return None
+
+            order_id = data['body']['orderId']
+            print(f"✅ Order created: {order_id}")
+
+            return order_id
+
+        except Exception as e:
+            print(f"❌ Exception during generation: {e}")
+            traceback.print_exc()
+            return None
+
+    # ==========================================================================
+    # LIGHTX V2 - CHECK STATUS
+    # ==========================================================================
+    def order_status(self, order_id):
+        """
+        Satu kali cek status order (tanpa sleep).
+        Return (status, output_url): status 'active' / 'failed' / 'init',
+        atau (None, None) jika request gagal (boleh dicoba lagi).
+        """
+        try:
+            payload = {"orderId": order_id}
+
+            response = self.request(
+                "status", "POST", self.base_url + STATUS_PATH, headers=self._headers(), json=payload
+            )
+
+            if response.status_code != 200:
+                print(f"⚠️ Status check failed: {response.text}")
+                return None, None
+
+            data = response.json()
+
+            if data.get('statusCode') != 2000:
+                print(f"⚠️ Error: {data.get('message')}")
+                return None, None
+
+            status = data['body']['status']
+            print(f">>> Status {order_id}: {status}")
+
+            if status == 'active':
+                return status, data['body']['output']
+            return status, None
+
+        except Exception as e:
+            print(f"❌ Exception during status check: {e}")
+            traceback.print_exc()
+            return None, None
+
+    def wait_for_order(self, order_id, schedule, category="custom"):
+        """
+        Step 3: Check status sampai 'active' (versi blocking), jeda antar cek
+        mengikuti jadwal adaptif dan berhenti saat deadline lewat
+        """
+        print(f">>> [STEP 3] Checking order status...")
+
+        start = time.monotonic()
+        polls = 0
+        last_poll = 0.0
+        while True:
+            delay = schedule.next_delay(category, time.monotonic() - start, polls)
+            if delay is None:
+                break
+            time.sleep(delay)
+
+            polls += 1
+            print(f">>> Cek status #{polls}...")
+            status, output_url = self.order_status(order_id)
+            elapsed = time.monotonic() - start
+
+            if status == 'active':
+                schedule.record(category, elapsed, previous_poll=last_poll)
+                print(f"✅ Generation complete! URL: {output_url}")
+                return output_url
+            elif status == 'failed':
+                print(f"❌ Generation failed")
+                return None
+            last_poll = elapsed
+
+        print(f"❌ Timeout setelah {schedule.deadline:.0f} detik ({polls} kali cek)")
+        return None
+
+    # ==========================================================================
+    # DOWNLOAD HASIL
+    # ==========================================================================
+    def download(self, output_url):
+        print(f">>> Downloading result from: {output_url}")
+        result_response = self.request("download", "GET", output_url)
+        result_response.raise_for_status()
+        return result_response.content
+
+
+def _failed_to_connect(error):
+    """True jika error terjadi saat membuka koneksi (request belum terkirim)."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    cause = error.args[0] if error.args else None
+    return isinstance(getattr(cause, "reason", cause), NewConnectionError)
+
+
+client = LightXClient(
+    Config.LIGHTX_BASE_URL,
+    LIGHTX_API_KEY,
+    pool_size=Config.LIGHTX_POOL_SIZE,
+    connect_timeout=Config.LIGHTX_CONNECT_TIMEOUT,
+    max_retries=Config.LIGHTX_MAX_RETRIES,
+    backoff_base=Config.LIGHTX_BACKOFF_BASE,
+    backoff_max=Config.LIGHTX_BACKOFF_MAX
+)
+
+# Jadwal cek status order, dipakai bersama oleh versi blocking & job runner
+poll_schedule = AdaptivePollSchedule(
+    min_interval=Config.LIGHTX_POLL_MIN_INTERVAL,
+    max_interval=Config.LIGHTX_POLL_MAX_INTERVAL,
+    deadline=Config.LIGHTX_POLL_DEADLINE
+)
+
+
+# ==============================================================================
+# HELPER MODUL (memakai client bersama)
+# ==============================================================================
+def upload_image_to_lightx(image_bytes):
+    return client.upload_image(image_bytes)
+
+
+def generate_hairstyle(image_url, text_prompt):
+    return client.create_order(image_url, text_prompt)
+
+
+def fetch_order_status(order_id):
+    return client.order_status(order_id)
+
+
+def check_order_status(order_id, category="custom", schedule=None):
+    return client.wait_for_order(order_id, schedule or poll_schedule, category)
+
+
+def download_result(output_url):
+    return client.download(output_url)
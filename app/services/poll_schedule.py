@@ -0,0 +1,101 @@
+import threading
+from collections import deque
+
+
+# ==============================================================================
+# JADWAL POLLING ADAPTIF (berdasarkan waktu selesai order per kategori)
+# ==============================================================================
+# Tanpa data: interval pendek yang membesar bertahap (exponential).
+# Dengan data: cek pertama di sekitar p10 waktu selesai, rapat di antara
+# p10..p90, lalu melebar di ekor distribusi. Semua dibatasi deadline.
+
+class CompletionStats:
+    """Simpan waktu selesai (detik) terakhir lalu hitung kuantilnya."""
+
+    def __init__(self, max_samples=200):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(float(seconds))
+
+    def __len__(self):
+        return len(self._samples)
+
+    def quantile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+class AdaptivePollSchedule:
+    def __init__(self, min_interval=0.5, max_interval=5.0, deadline=60.0,
+                 min_samples=5, growth=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.deadline = deadline
+        self.min_samples = min_samples
+        self.growth = growth
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _category(self, category):
+        with self._lock:
+            stats = self._stats.get(category)
+            if stats is None:
+                stats = self._stats[category] = CompletionStats()
+            return stats
+
+    def record(self, category, seconds, previous_poll=0.0):
+        """
+        Catat waktu dari order dibuat sampai status 'active'. Order selesai
+        di antara cek sebelumnya dan cek ini, jadi yang disimpan titik
+        tengahnya (tanpa ini statistik bias ke atas mengikuti jadwal sendiri).
+        """
+        self._category(category).record((previous_poll + seconds) / 2)
+
+    def _clamp(self, delay):
+        return min(self.max_interval, max(self.min_interval, delay))
+
+    def next_delay(self, category, elapsed, polls):
+        """
+        Jeda (detik) sebelum cek berikutnya, atau None jika deadline sudah lewat.
+        `elapsed` = detik sejak order dibuat, `polls` = jumlah cek sebelumnya.
+        """
+        remaining = self.deadline - elapsed
+        if remaining <= 0:
+            return None
+
+        stats = self._category(category)
+        if len(stats) < self.min_samples:
+            # Belum ada data: mulai pendek, membesar bertahap
+            delay = self._clamp(self.min_interval * (self.growth ** polls))
+        else:
+            q_lo, q_hi = stats.quantile(0.1), stats.quantile(0.9)
+            if elapsed < q_lo:
+                # Hampir pasti belum selesai: langsung lompat ke p10
+                delay = max(self.min_interval, q_lo - elapsed)
+            elif elapsed < q_hi:
+                # Jendela penyelesaian paling padat: cek rapat
+                delay = self._clamp((q_hi - q_lo) / 8)
+            else:
+                # Ekor distribusi (order lambat): perlebar jeda
+                delay = self._clamp(self.min_interval + (elapsed - q_hi) / 2)
+
+        return min(delay, remaining)
+
+    def stats(self):
+        with self._lock:
+            categories = dict(self._stats)
+        return {
+            name: {
+                "samples": len(stats),
+                "p10_s": stats.quantile(0.1),
+                "p50_s": stats.quantile(0.5),
+                "p90_s": stats.quantile(0.9)
+            }
+            for name, stats in categories.items()
+        }
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+from firebase_admin import firestore
+from app.extensions import db
+
+
+# ==============================================================================
+# ROLLUP AKTIVITAS PER HARI / PER JAM (untuk grafik dashboard)
+# ==============================================================================
+# Satu dokumen per hari di `stats_daily/<YYYY-MM-DD>`:
+#   { signups: 3, logins: 10, ..., hours: { "13": { signups: 1, logins: 4 } } }
+# Handler menaikkan counter (Increment) saat event terjadi, sebaiknya dalam
+# batch yang sama dengan tulisan datanya. Grafik N hari = N dokumen dibaca
+# sekaligus lewat get_all(), tanpa scan koleksi users/history/feedbacks.
+# Hari & jam selalu dalam UTC, sama seperti timestamp yang dikembalikan
+# Firestore (dipakai backfill), berapa pun zona waktu server.
+
+EVENTS = ('signups', 'logins', 'analyses', 'edits', 'feedbacks')
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class RollupStore:
+    def __init__(self, db, collection='stats_daily'):
+        self.db = db
+        self.collection = db.collection(collection)
+
+    def _day_ref(self, day):
+        return self.collection.document(day.strftime('%Y-%m-%d'))
+
+    def stage(self, batch, event, when=None, count=1):
+        """Tambahkan increment event ke batch/transaction yang sedang disusun."""
+        when = (when or utc_now()).astimezone(timezone.utc)
+        batch.set(self._day_ref(when), {
+            "date": when.strftime('%Y-%m-%d'),
+            event: firestore.Increment(count),
+            "hours": {f"{when.hour:02d}": {event: firestore.Increment(count)}}
+        }, merge=True)
+
+    def record(self, event, when=None, count=1):
+        """Catat event yang tidak punya tulisan data sendiri (satu write)."""
+        batch = self.db.batch()
+        self.stage(batch, event, when, count)
+        batch.commit()
+
+    def _load_days(self, days):
+        refs = [self._day_ref(day) for day in days]
+        snapshots = {snap.id: snap.to_dict() or {} for snap in self.db.get_all(refs)}
+        return [snapshots.get(ref.id, {}) for ref in refs]
+
+    def daily(self, events=EVENTS, days=7, today=None):
+        """Return (list tanggal, {event: [nilai per hari]}) untuk `days` hari terakhir."""
+        today = today or utc_now()
+        dates = [today - timedelta(days=i) for i in range(days - 1, -1, -1)]
+        docs = self._load_days(dates)
+        return dates, {event: [doc.get(event, 0) for doc in docs] for event in events}
+
+    def hourly(self, events=EVENTS, hours=24, now=None):
+        """Return (list jam, {event: [nilai per jam]}) untuk `hours` jam terakhir."""
+        now = (now or utc_now()).replace(minute=0, second=0, microsecond=0)
+        slots = [now - timedelta(hours=i) for i in range(hours - 1, -1, -1)]
+
+        # Dokumen harian yang tercakup (biasanya 2)
+        days = sorted({slot.date() for slot in slots})
+        by_day = dict(zip(days, self._load_days(days)))
+
+        series = {event: [] for event in events}
+        for slot in slots:
+            bucket = by_day[slot.date()].get('hours', {}).get(f"{slot.hour:02d}", {})
+            for event in events:
+                series[event].append(bucket.get(event, 0))
+        return slots, series
+
+    def backfill_signups(self):
+        """
+        Hitung ulang rollup `signups` dari users.created_at (hanya field itu
+        yang diambil). Field signups harian & per jam ditimpa (jam/hari tanpa
+        signup di-nol-kan), event lain tidak disentuh. Aman dijalankan berulang.
+        """
+        buckets = {}
+        for doc in self.db.collection('users').select(['created_at']).stream():
+            created = doc.to_dict().get('created_at')
+            if not created:
+                continue
+            created = created.astimezone(timezone.utc)
+            day = buckets.setdefault(created.strftime('%Y-%m-%d'), {})
+            day[created.hour] = day.get(created.hour, 0) + 1
+
+        # Hari lama yang kini tanpa signup (mis. user dihapus) juga di-nol-kan
+        for doc in self.collection.select(['signups']).stream():
+            buckets.setdefault(doc.id, {})
+
+        batch, pending = self.db.batch(), 0
+        for date, hours in buckets.items():
+            # Semua 24 jam ditulis eksplisit: merge hanya menimpa key yang
+            # dikirim, jadi jam yang tidak dikirim akan tetap menyimpan nilai lama
+            batch.set(self.collection.document(date), {
+                "date": date,
+                "signups": sum(hours.values()),
+                "hours": {f"{hour:02d}": {"signups": hours.get(hour, 0)} for hour in range(24)}
+            }, merge=True)
+            pending += 1
+            if pending == 500:  # batas operasi per WriteBatch
+                batch.commit()
+                batch, pending = self.db.batch(), 0
+        if pending:
+            batch.commit()
+        return len(buckets)
+
+rollups = RollupStore(db)
@@ -0,0 +1,85 @@
+import threading
+from flask import g, has_app_context
+from config import Config
+from app.extensions import db
+from app.utils.cache import TTLCache
+
+
+# ==============================================================================
+# CACHE DOKUMEN USER (users/<email>)
+# ==============================================================================
+# Tier 1: memo per request di flask.g (satu read per request, berapa pun
+# handler/loader yang memanggil). Tier 2: LRU proses dengan TTL pendek, jadi
+# data basi antar worker paling lama USER_CACHE_TTL detik. Setiap handler
+# yang menulis dokumen user wajib memanggil invalidate(email).
+
+_MISSING = object()
+
+
+class UserCache:
+    def __init__(self, db, max_size=1024, ttl=30):
+        self.db = db
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.memo_hits = 0
+        self.reads = 0
+        self._lock = threading.Lock()
+
+    def _memo(self):
+        if not has_app_context():
+            return None
+        if 'user_docs' not in g:
+            g.user_docs = {}
+        return g.user_docs
+
+    def get(self, email):
+        """Data user (salinan dict) atau None jika tidak ada."""
+        if not email:
+            return None
+
+        memo = self._memo()
+        data = memo.get(email, _MISSING) if memo is not None else _MISSING
+        if data is not _MISSING:
+            with self._lock:
+                self.memo_hits += 1
+        else:
+            data = self.memory.get(email, _MISSING)
+            if data is _MISSING:
+                data = self._load(email)
+            if memo is not None:
+                memo[email] = data
+
+        # Salinan: handler boleh mengubah dict (mis. pop password_hash)
+        return dict(data) if data is not None else None
+
+    def _load(self, email):
+        with self._lock:
+            self.reads += 1
+        doc = self.db.collection('users').document(email).get()
+        if not doc.exists:
+            # User tidak ada tidak di-cache (bisa segera register)
+            return None
+        data = doc.to_dict()
+        self.memory.set(email, data)
+        return data
+
+    def invalidate(self, *emails):
+        memo = self._memo()
+        for email in emails:
+            self.memory.pop(email)
+            if memo is not None:
+                memo.pop(email, None)
+
+    def stats(self):
+        memory = self.memory.stats()
+        saved = self.memo_hits + memory["hits"]
+        total = saved + self.reads
+        return {
+            **memory,
+            "memo_hits": self.memo_hits,
+            "firestore_reads": self.reads,
+            "reads_saved": saved,
+            "saved_rate": round(saved / total, 3) if total else None
+        }
+
+
+user_cache = UserCache(db, max_size=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
@@ -19,3 +19,30 @@ def on_join(data):
 
     # Logging untuk debugging
     print(f"User masuk ke room video call: {room}")
+
+# Event untuk berlangganan update job edit style (LightX async)
+@socketio.on('subscribe_job')
+def on_subscribe_job(data):
+    from app.services.lightx_jobs import job_store
+    from app.routes.style_routes import job_to_json
+
+    job_id = data.get('job_id')
+    socketio.server.enter_room(request.sid, f"job:{job_id}")
+
+    # Kirim state saat ini agar update yang terjadi sebelum subscribe tidak hilang
+    job = job_store.get(job_id)
+    if job:
+        socketio.emit('style_job', job_to_json(job), to=request.sid)
+
+# Event untuk berlangganan semua job dalam satu batch "coba semua style"
+@socketio.on('subscribe_batch')
+def on_subscribe_batch(data):
+    from app.services.lightx_jobs import lightx_jobs
+    from app.routes.style_routes import batch_to_json
+
+    batch_id = data.get('batch_id')
+    socketio.server.enter_room(request.sid, f"batch:{batch_id}")
+
+    batch = lightx_jobs.get_batch(batch_id)
+    if batch:
+        socketio.emit('style_batch', batch_to_json(batch), to=request.sid)
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+# ==============================================================================
+# ALPHA BLENDING VEKTOR (fixed-point uint16, hanya di area mask)
+# ==============================================================================
+# Semua fungsi menulis ke buffer `out` (default: background, in-place) dan
+# hanya menyentuh bounding box piksel mask yang tidak nol.
+
+def mask_bbox(mask, pad=0):
+    """Bounding box (y0, y1, x0, x1) piksel mask yang tidak nol, atau None."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+
+    h, w = mask.shape[:2]
+    return (
+        max(0, rows[0] - pad), min(h, rows[-1] + 1 + pad),
+        max(0, cols[0] - pad), min(w, cols[-1] + 1 + pad)
+    )
+
+
+def _div255(x):
+    # Pembagian bulat x/255 untuk x ≤ 65025 tanpa float: ((t + (t >> 8)) >> 8)
+    x += 128
+    x += x >> 8
+    x >>= 8
+    return x
+
+
+def _prepare_out(background, out):
+    if out is None:
+        return background
+    if out is not background:
+        np.copyto(out, background)
+    return out
+
+
+def blend_masked(background, foreground, alpha, out=None, bbox=None):
+    """
+    out = fg * a + bg * (1 - a), alpha uint8 (0..255) berukuran sama dengan gambar.
+    Dihitung sekaligus untuk 3 channel (broadcast), hanya di dalam bbox.
+    """
+    out = _prepare_out(background, out)
+    bbox = bbox or mask_bbox(alpha)
+    if bbox is None:
+        return out
+
+    y0, y1, x0, x1 = bbox
+    a = alpha[y0:y1, x0:x1, None].astype(np.uint16)
+    fg = foreground[y0:y1, x0:x1].astype(np.uint16)
+    bg = background[y0:y1, x0:x1].astype(np.uint16)
+
+    fg *= a
+    bg *= (255 - a)
+    fg += bg
+    out[y0:y1, x0:x1] = _div255(fg)
+    return out
+
+
+def blend_premultiplied(background, overlay, x, y, out=None):
+    """
+    Tempel stiker BGRA premultiplied di posisi (x, y):
+    out = warna_premultiplied + bg * (1 - a). Bagian di luar frame dipotong.
+    """
+    out = _prepare_out(background, out)
+    bh, bw = background.shape[:2]
+    oh, ow = overlay.shape[:2]
+
+    # Cek bounding agar overlay tidak keluar frame
+    x_s, y_s = max(0, x), max(0, y)
+    x_e, y_e = min(bw, x + ow), min(bh, y + oh)
+    if x_s >= x_e or y_s >= y_e:
+        return out
+
+    ox_s, oy_s = x_s - x, y_s - y
+    sticker = overlay[oy_s:oy_s + (y_e - y_s), ox_s:ox_s + (x_e - x_s)]
+
+    inv_a = 255 - sticker[:, :, 3:4].astype(np.uint16)
+    bg = background[y_s:y_e, x_s:x_e].astype(np.uint16)
+    bg *= inv_a
+    bg = _div255(bg)
+    bg += sticker[:, :, :3]
+    np.minimum(bg, 255, out=bg)
+    out[y_s:y_e, x_s:x_e] = bg
+    return out
@@ -0,0 +1,66 @@
+import os
+from flask import Response
+
+# ==============================================================================
+# TRANSPORT GAMBAR BINER (multipart masuk, image/jpeg | image/webp keluar)
+# ==============================================================================
+
+IMAGE_MIMETYPES = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def upload_size(file):
+    """Ukuran file upload (FileStorage) tanpa membaca isinya."""
+    stream = file.stream
+    pos = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell() - pos
+    stream.seek(pos)
+    return size
+
+
+def read_into(file, buffer):
+    """
+    Baca stream upload langsung ke `buffer` (numpy array / shared memory),
+    tanpa membuat salinan bytes di tengah jalan. Return jumlah byte terbaca.
+    """
+    view = memoryview(buffer).cast('B')
+    total = 0
+    while total < len(view):
+        n = file.stream.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    view.release()
+    return total
+
+
+def negotiate_format(request, default="jpeg"):
+    """Format output dari ?format= / field form, atau header Accept."""
+    fmt = (request.args.get('format') or request.form.get('format') or '').lower()
+    if fmt in ("jpg", "jpeg"):
+        return "jpeg"
+    if fmt == "webp":
+        return "webp"
+    # Accept: image/webp,*/*;q=0.8 → webp lebih disukai daripada jpeg
+    accept = request.accept_mimetypes
+    if accept["image/webp"] > accept["image/jpeg"]:
+        return "webp"
+    return default
+
+
+def image_response(data, fmt="jpeg", headers=None):
+    """Kirim bytes gambar sebagai body ter-stream (chunk 64 KB, tanpa base64)."""
+    view = memoryview(data)
+
+    def generate():
+        for start in range(0, len(view), STREAM_CHUNK_SIZE):
+            yield view[start:start + STREAM_CHUNK_SIZE].tobytes()
+
+    response = Response(generate(), mimetype=IMAGE_MIMETYPES[fmt], headers=headers or {})
+    response.headers["Content-Length"] = str(len(view))
+    return response
@@ -0,0 +1,36 @@
+import threading
+from collections import deque
+
+
+class LatencyRecorder:
+    """Simpan sampel latency terakhir (ms) lalu hitung persentilnya."""
+
+    def __init__(self, max_samples=1024):
+        self._samples = deque(maxlen=max_samples)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, ms):
+        with self._lock:
+            self._samples.append(float(ms))
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self._count
+
+        if not samples:
+            return {"count": count, "p50": None, "p90": None, "p99": None, "max": None}
+
+        def pct(p):
+            idx = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+            return round(samples[idx], 2)
+
+        return {
+            "count": count,
+            "p50": pct(50),
+            "p90": pct(90),
+            "p99": pct(99),
+            "max": round(samples[-1], 2)
+        }
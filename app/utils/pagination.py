@@ -0,0 +1,27 @@
+# ==============================================================================
+# PAGINASI CURSOR FIRESTORE
+# ==============================================================================
+# Cursor = ID dokumen terakhir di halaman sebelumnya; query dilanjutkan dengan
+# start_after(snapshot dokumen itu). Tidak ada offset, jadi biaya per halaman
+# tetap `limit` dokumen berapa pun dalamnya halaman.
+
+def clamp_limit(value, default, maximum):
+    """Ukuran halaman dari query string; nilai tidak valid → default."""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def fetch_page(query, limit, cursor_doc=None):
+    """
+    Ambil satu halaman (+1 dokumen untuk tahu masih ada halaman berikutnya).
+    Return (docs, next_cursor); next_cursor None jika sudah halaman terakhir.
+    """
+    if cursor_doc is not None:
+        query = query.start_after(cursor_doc)
+    docs = query.limit(limit + 1).get()
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    return docs, (docs[-1].id if has_more else None)
@@ -0,0 +1,81 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from app.utils.metrics import LatencyRecorder
+
+
+class ResourcePool:
+    """
+    Pool objek berat (interpreter, graph model) dengan semantik checkout/return.
+    Setiap objek hanya dipakai oleh satu thread dalam satu waktu.
+    """
+
+    def __init__(self, factory, size, name="pool", lazy=False):
+        self.name = name
+        self.size = max(1, int(size))
+        self._factory = factory
+        self._items = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        self.wait_times = LatencyRecorder()
+
+        # lazy=True: instance baru dibuat saat dibutuhkan (maksimal `size`),
+        # proses yang tidak pernah memakai pool tidak memuat model sama sekali
+        if not lazy:
+            for _ in range(self.size):
+                self._items.put(factory())
+            self._created = self.size
+
+    def _acquire(self, timeout):
+        with self._lock:
+            grow = self._items.empty() and self._created < self.size
+            if grow:
+                self._created += 1
+
+        if grow:
+            try:
+                return self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._items.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Pool '{self.name}' penuh, tidak ada instance tersedia")
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        start = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        try:
+            item = self._acquire(timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        self.wait_times.record((time.perf_counter() - start) * 1000)
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield item
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._items.put(item)
+
+    def stats(self):
+        with self._lock:
+            in_use, waiting = self._in_use, self._waiting
+        return {
+            "size": self.size,
+            "created": self._created,
+            "in_use": in_use,
+            "queue_depth": waiting,
+            "wait_ms": self.wait_times.snapshot()
+        }
@@ -0,0 +1,286 @@
+"""
+Benchmark performa komponen AI MyHeadStyle.
+
+Cara pakai:
+    python benchmark.py batch        # throughput inferensi TFLite per ukuran batch (+ paritas batch vs satuan)
+    python benchmark.py detect       # latency & recall backend face detector
+    python benchmark.py pyramid      # deteksi resolusi penuh vs gambar diperkecil (exit 1 jika paritas gagal)
+    python benchmark.py blend        # blending rambut lama vs vektor ROI (720p/1080p/4K)
+    python benchmark.py proxy        # EditService resolusi penuh vs proxy (latency & kualitas)
+"""
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+MODEL_FILE = os.path.join(BASE_DIR, 'app', 'model_ai', 'face_shape_model.tflite')
+SAMPLE_DIR = os.path.join(BASE_DIR, 'app', 'static', 'temp_scans')
+
+
+def load_samples():
+    images = []
+    for name in sorted(os.listdir(SAMPLE_DIR)):
+        img = cv2.imread(os.path.join(SAMPLE_DIR, name), cv2.IMREAD_COLOR)
+        if img is not None:
+            images.append((name, img))
+    return images
+
+
+# ==============================================================================
+# 1. THROUGHPUT MICRO-BATCH INFERENSI (images/sec)
+# ==============================================================================
+# Toleransi paritas: output batch vs invoke satu per satu (probabilitas softmax)
+BATCH_MAX_ABS_DIFF = 1e-4
+
+
+def bench_batch(batch_sizes=(1, 4, 8, 16), rounds=20, tolerance=BATCH_MAX_ABS_DIFF):
+    """Return True jika output batch sama dengan output satuan (max abs diff ≤ tolerance)."""
+    from app.services.ai_service import BatchInferenceEngine, PooledInterpreter
+    from app.utils.pool import ResourcePool
+
+    # Satu interpreter saja agar angka mencerminkan efek batching murni
+    pool = ResourcePool(lambda: PooledInterpreter(MODEL_FILE), size=1, name="bench")
+    engine = BatchInferenceEngine(pool, max_batch_size=max(batch_sizes))
+    failures = []
+
+    print(f"Toleransi paritas batch vs satuan: max abs diff ≤ {tolerance:g}\n")
+    print(f"{'batch':>6} | {'images/sec':>12} | {'ms/batch':>10} | {'max diff':>9}")
+    print("-" * 48)
+    for n in batch_sizes:
+        inputs = np.random.randint(0, 255, (n, 224, 224, 3)).astype('float32')
+
+        # Warm-up (termasuk realokasi tensor untuk ukuran batch baru)
+        batched = engine.run_batch(inputs)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            engine.run_batch(inputs)
+        elapsed = time.perf_counter() - start
+
+        single = np.concatenate([engine.run_batch(inputs[i:i + 1]) for i in range(n)])
+        diff = float(np.abs(batched - single).max())
+        if diff > tolerance:
+            failures.append(f"batch {n}: max abs diff {diff:g} > {tolerance:g}")
+
+        print(f"{n:>6} | {n * rounds / elapsed:>12.1f} | {elapsed / rounds * 1000:>10.2f} | {diff:>9.2g}")
+
+    if failures:
+        print("\n❌ Paritas gagal:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return False
+    print("\n✅ Paritas batch lolos")
+    return True
+
+
+# ==============================================================================
+# 2. LATENCY & RECALL FACE DETECTOR (sampel app/static/temp_scans)
+# ==============================================================================
+def bench_detect(rounds=10):
+    from app.services.face_detector import create_face_detector
+
+    samples = load_samples()
+    # Semua sampel berisi satu wajah → recall = porsi gambar yang wajahnya terdeteksi
+    print(f"{len(samples)} sampel dari {SAMPLE_DIR}\n")
+    print(f"{'backend':>10} | {'ms/img':>8} | {'recall':>7}")
+    print("-" * 32)
+    for backend in ('haar', 'yunet', 'mediapipe'):
+        detector = create_face_detector(backend)
+        if detector.name != backend:
+            print(f"{backend:>10} | {'(tidak tersedia)':>18}")
+            continue
+
+        found = sum(1 for _, img in samples if detector.detect(img))
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for _, img in samples:
+                detector.detect(img)
+        ms = (time.perf_counter() - start) / (rounds * len(samples)) * 1000
+
+        print(f"{backend:>10} | {ms:>8.2f} | {found / len(samples):>7.0%}")
+
+
+# ==============================================================================
+# 3. DETEKSI DI GAMBAR DIPERKECIL vs RESOLUSI PENUH (latency & paritas kotak)
+# ==============================================================================
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+# Toleransi paritas: kotak jalur bounded minimal IoU ini terhadap jalur lama
+PYRAMID_MIN_IOU = 0.75
+
+
+def bench_pyramid(upscales=(1, 2, 4, 6), rounds=3, min_iou=PYRAMID_MIN_IOU):
+    """Return True jika semua sampel lolos paritas (IoU ≥ min_iou, tanpa MISS)."""
+    from config import Config
+    from app.services.face_detector import HaarFaceDetector, detect_bounded
+
+    detector = HaarFaceDetector()
+    max_side = Config.FACE_DETECT_MAX_SIDE or 640
+    failures = []
+
+    print(f"Deteksi dibatasi ke sisi terpanjang {max_side}px, toleransi IoU ≥ {min_iou:.2f}\n")
+    print(f"{'sample':>10} | {'ukuran':>11} | {'full ms':>8} | {'bounded ms':>10} | {'IoU':>5}")
+    print("-" * 58)
+    for name, base in load_samples():
+        for k in upscales:
+            # Simulasi upload kamera resolusi tinggi
+            img = cv2.resize(base, None, fx=k, fy=k, interpolation=cv2.INTER_CUBIC)
+
+            def timed(fn):
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    faces = fn()
+                return faces, (time.perf_counter() - start) / rounds * 1000
+
+            full, full_ms = timed(lambda: detector.detect(img))
+            bounded, bounded_ms = timed(lambda: detect_bounded(detector, img, max_side))
+
+            # Paritas: kotak pertama jalur lama harus cocok dengan salah satu kotak baru
+            size = f"{img.shape[1]}x{img.shape[0]}"
+            if full and bounded:
+                score = max(box_iou(full[0], b) for b in bounded)
+                iou = f"{score:.2f}"
+                if score < min_iou:
+                    failures.append(f"{name} {size}: IoU {score:.2f} < {min_iou:.2f}")
+            else:
+                iou = "ok" if not full and not bounded else "MISS"
+                if iou == "MISS":
+                    failures.append(f"{name} {size}: wajah hanya terdeteksi di salah satu jalur")
+
+            print(f"{name[:10]:>10} | {size:>11} | {full_ms:>8.1f} | {bounded_ms:>10.1f} | {iou:>5}")
+
+    if failures:
+        print("\n❌ Paritas gagal:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return False
+    print("\n✅ Paritas deteksi lolos")
+    return True
+
+
+# ==============================================================================
+# 4. MICROBENCHMARK BLENDING WARNA RAMBUT
+# ==============================================================================
+def legacy_hair_blend(image, colored_img, hair_mask):
+    # Implementasi lama: float64 seluruh gambar, loop per channel
+    mask_float = hair_mask.astype(float)
+    mask_float = cv2.GaussianBlur(mask_float, (15, 15), 0)
+    for c in range(3):
+        image[:, :, c] = image[:, :, c] * (1 - mask_float) + colored_img[:, :, c] * mask_float
+    return image
+
+
+def roi_hair_blend(image, colored_img, hair_mask, out):
+    from app.utils.blending import mask_bbox, blend_masked
+
+    bbox = mask_bbox(hair_mask, pad=14)
+    y0, y1, x0, x1 = bbox
+    alpha = np.zeros(hair_mask.shape, np.uint8)
+    alpha[y0:y1, x0:x1] = cv2.GaussianBlur(
+        hair_mask[y0:y1, x0:x1].astype(np.uint8) * 255, (15, 15), 0
+    )
+    return blend_masked(image, colored_img, alpha, out=out, bbox=bbox)
+
+
+def bench_blend(rounds=10):
+    resolutions = {"720p": (720, 1280), "1080p": (1080, 1920), "4K": (2160, 3840)}
+
+    print(f"{'res':>6} | {'lama ms':>8} | {'ROI ms':>8} | {'speedup':>7} | {'max diff':>8}")
+    print("-" * 50)
+    for label, (h, w) in resolutions.items():
+        image = np.random.randint(0, 255, (h, w, 3), np.uint8)
+        colored = np.random.randint(0, 255, (h, w, 3), np.uint8)
+
+        # Mask rambut ± 15% area gambar di bagian atas (kasus tipikal selfie)
+        hair_mask = np.zeros((h, w), bool)
+        cv2.ellipse(hair_mask.view(np.uint8), (w // 2, h // 4), (w // 6, h // 6), 0, 0, 360, 1, -1)
+
+        out = np.empty_like(image)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            legacy = legacy_hair_blend(image.copy(), colored, hair_mask)
+        legacy_ms = (time.perf_counter() - start) / rounds * 1000
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            roi_hair_blend(image, colored, hair_mask, out)
+        roi_ms = (time.perf_counter() - start) / rounds * 1000
+
+        diff = np.abs(legacy.astype(int) - out.astype(int)).max()
+        print(f"{label:>6} | {legacy_ms:>8.1f} | {roi_ms:>8.1f} | {legacy_ms / roi_ms:>6.1f}x | {diff:>8}")
+
+
+# ==============================================================================
+# 5. EDIT SERVICE: ANALISIS RESOLUSI PENUH vs PROXY
+# ==============================================================================
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def bench_proxy(upscales=(1, 2, 4), rounds=3):
+    from config import Config
+    from app.services.edit_service import EditService
+
+    full = EditService(processing_mode='full', graph_pool_size=1)
+    proxy = EditService(processing_mode='proxy', graph_pool_size=1)
+    operations = [
+        {"type": "color", "value": "#8B4513"},
+        {"type": "glasses", "value": "g1"},
+        {"type": "hair", "value": "male/m1"}
+    ]
+
+    print(f"Proxy: sisi terpanjang {Config.EDIT_PROXY_MAX_SIDE}px\n")
+    print(f"{'ukuran':>11} | {'full ms':>8} | {'proxy ms':>8} | {'speedup':>7} | {'PSNR dB':>7}")
+    print("-" * 54)
+    for name, base in load_samples()[:1]:
+        for k in upscales:
+            img = cv2.resize(base, None, fx=k, fy=k, interpolation=cv2.INTER_CUBIC)
+
+            def timed(service):
+                service.run_pipeline(img.copy(), operations)  # warm-up
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    result, _ = service.run_pipeline(img.copy(), operations)
+                return result, (time.perf_counter() - start) / rounds * 1000
+
+            full_img, full_ms = timed(full)
+            proxy_img, proxy_ms = timed(proxy)
+
+            size = f"{img.shape[1]}x{img.shape[0]}"
+            print(f"{size:>11} | {full_ms:>8.1f} | {proxy_ms:>8.1f} | "
+                  f"{full_ms / proxy_ms:>6.1f}x | {psnr(full_img, proxy_img):>7.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark MyHeadStyle")
+    parser.add_argument('target', choices=['batch', 'detect', 'pyramid', 'blend', 'proxy'])
+    parser.add_argument('--max-diff', type=float, default=BATCH_MAX_ABS_DIFF,
+                        help="toleransi paritas mode batch")
+    parser.add_argument('--min-iou', type=float, default=PYRAMID_MIN_IOU,
+                        help="toleransi paritas mode pyramid")
+    args = parser.parse_args()
+
+    if args.target == 'batch':
+        sys.exit(0 if bench_batch(tolerance=args.max_diff) else 1)
+    elif args.target == 'detect':
+        bench_detect()
+    elif args.target == 'pyramid':
+        sys.exit(0 if bench_pyramid(min_iou=args.min_iou) else 1)
+    elif args.target == 'blend':
+        bench_blend()
+    elif args.target == 'proxy':
+        bench_proxy()
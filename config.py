@@ -2,4 +2,126 @@ import os
 class Config:
     SECRET_KEY = 'myheadstyle-rahasia'
     JWT_SECRET_KEY = 'jwt-myheadstyle-secret'
-    FIREBASE_STORAGE_BUCKET = "myheadstyle.firebasestorage.app"
\ No newline at end of file
+    FIREBASE_STORAGE_BUCKET = "myheadstyle.firebasestorage.app"
+
+    # --- AI: micro-batching inferensi TFLite ---
+    # Jendela tunggu (ms) untuk mengumpulkan crop dari request paralel
+    AI_BATCH_WINDOW_MS = float(os.environ.get('AI_BATCH_WINDOW_MS', 5))
+    # Jumlah maksimal gambar dalam satu invoke()
+    AI_BATCH_MAX_SIZE = int(os.environ.get('AI_BATCH_MAX_SIZE', 8))
+
+    # --- AI: pool interpreter TFLite ---
+    # Jumlah interpreter; semuanya dimuat saat start, jadi default kecil
+    # (naikkan sesuai jumlah core jika memori cukup)
+    AI_INTERPRETER_POOL_SIZE = int(os.environ.get('AI_INTERPRETER_POOL_SIZE', 2))
+    # num_threads per interpreter
+    AI_INTERPRETER_THREADS = int(os.environ.get('AI_INTERPRETER_THREADS', 1))
+
+    # --- AI: face detector ---
+    # Backend deteksi wajah: 'haar' (default), 'yunet', atau 'mediapipe'
+    FACE_DETECTOR_BACKEND = os.environ.get('FACE_DETECTOR_BACKEND', 'haar')
+    # File ONNX YuNet (opencv_zoo: face_detection_yunet_2023mar.onnx)
+    FACE_DETECTOR_YUNET_MODEL = os.environ.get(
+        'FACE_DETECTOR_YUNET_MODEL',
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app', 'model_ai', 'face_detection_yunet_2023mar.onnx')
+    )
+    # Sisi terpanjang gambar saat deteksi YuNet/MediaPipe
+    FACE_DETECTOR_SIZE = int(os.environ.get('FACE_DETECTOR_SIZE', 320))
+    # Sisi terpanjang gambar untuk pass deteksi (0 = deteksi di resolusi penuh)
+    FACE_DETECT_MAX_SIDE = int(os.environ.get('FACE_DETECT_MAX_SIDE', 640))
+
+    # --- AI: cache hasil analisis (key = hash gambar + versi model) ---
+    AI_CACHE_SIZE = int(os.environ.get('AI_CACHE_SIZE', 512))
+    AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 3600))
+    # Folder cache di disk (kosong = hanya in-memory)
+    AI_CACHE_DIR = os.environ.get('AI_CACHE_DIR', '')
+
+    # --- Edit: registry asset overlay ---
+    # Jumlah hasil transform (asset, lebar, sudut) yang disimpan di LRU
+    ASSET_TRANSFORM_CACHE_SIZE = int(os.environ.get('ASSET_TRANSFORM_CACHE_SIZE', 64))
+    # Interval (detik) cek perubahan file assets/ untuk hot-reload (0 = nonaktif)
+    ASSET_RELOAD_INTERVAL = float(os.environ.get('ASSET_RELOAD_INTERVAL', 2))
+
+    # --- Edit: resolusi analisis MediaPipe ---
+    # 'full' = resolusi upload (hasil sama seperti sebelumnya), 'proxy' = segmentasi &
+    # landmark di gambar kecil (lebih cepat, hasil sedikit berbeda; lihat benchmark.py proxy)
+    EDIT_PROCESSING_MODE = os.environ.get('EDIT_PROCESSING_MODE', 'full')
+    # Sisi terpanjang gambar proxy untuk analisis
+    EDIT_PROXY_MAX_SIDE = int(os.environ.get('EDIT_PROXY_MAX_SIDE', 512))
+    # Jumlah pasangan graph MediaPipe (segmentasi + face mesh) di pool; dibuat
+    # semua saat start, jadi default kecil (naikkan jika memori cukup)
+    EDIT_GRAPH_POOL_SIZE = int(os.environ.get('EDIT_GRAPH_POOL_SIZE', 2))
+
+    # --- Worker process untuk pekerjaan gambar (decode/deteksi/inferensi/edit/encode) ---
+    # Jumlah proses worker (0 = dijalankan langsung di thread request)
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 0))
+    # Maksimal job yang antri + berjalan sebelum request ditolak 503 (0 = 4x jumlah worker)
+    IMAGE_QUEUE_MAX = int(os.environ.get('IMAGE_QUEUE_MAX', 0))
+    # Batas waktu satu job (detik)
+    IMAGE_JOB_TIMEOUT = int(os.environ.get('IMAGE_JOB_TIMEOUT', 60))
+    # Nilai header Retry-After (detik) saat antrian penuh
+    IMAGE_RETRY_AFTER = int(os.environ.get('IMAGE_RETRY_AFTER', 2))
+
+    # --- Job generate hairstyle LightX (background) ---
+    # Thread untuk upload/order/cek status ke LightX
+    LIGHTX_JOB_WORKERS = int(os.environ.get('LIGHTX_JOB_WORKERS', 8))
+    # Jadwal cek status adaptif: batas jeda antar cek (detik) & deadline per order
+    LIGHTX_POLL_MIN_INTERVAL = float(os.environ.get('LIGHTX_POLL_MIN_INTERVAL', 0.5))
+    LIGHTX_POLL_MAX_INTERVAL = float(os.environ.get('LIGHTX_POLL_MAX_INTERVAL', 5))
+    LIGHTX_POLL_DEADLINE = float(os.environ.get('LIGHTX_POLL_DEADLINE', 60))
+    # Endpoint lama (blocking) menunggu hasil maksimal sekian detik, lalu
+    # membalas 202 + URL status job (setara batas polling lama ±15 detik)
+    LIGHTX_SYNC_WAIT = float(os.environ.get('LIGHTX_SYNC_WAIT', 20))
+    # Berapa lama (detik) & berapa banyak job disimpan di job store lokal
+    LIGHTX_JOB_TTL = int(os.environ.get('LIGHTX_JOB_TTL', 600))
+    LIGHTX_JOB_STORE_SIZE = int(os.environ.get('LIGHTX_JOB_STORE_SIZE', 1024))
+
+    # --- HTTP client LightX ---
+    # Base URL API (bisa diarahkan ke stub lokal: python lightx_stub.py)
+    LIGHTX_BASE_URL = os.environ.get('LIGHTX_BASE_URL', 'https://api.lightxeditor.com').rstrip('/')
+    LIGHTX_API_KEY = os.environ.get(
+        'LIGHTX_API_KEY',
+        'd9b68e13818e4b199384f83347223938cb5d8d7fd80e405aab5d993467d1e81a_andoraitools'
+    )
+    # Jumlah koneksi keep-alive per host
+    LIGHTX_POOL_SIZE = int(os.environ.get('LIGHTX_POOL_SIZE', 16))
+    LIGHTX_CONNECT_TIMEOUT = float(os.environ.get('LIGHTX_CONNECT_TIMEOUT', 5))
+    # Retry untuk 429/5xx & gagal koneksi (exponential backoff + jitter)
+    LIGHTX_MAX_RETRIES = int(os.environ.get('LIGHTX_MAX_RETRIES', 3))
+    LIGHTX_BACKOFF_BASE = float(os.environ.get('LIGHTX_BACKOFF_BASE', 0.5))
+    LIGHTX_BACKOFF_MAX = float(os.environ.get('LIGHTX_BACKOFF_MAX', 8))
+
+    # --- Cache hasil generate LightX (key = hash gambar + prompt) ---
+    LIGHTX_CACHE_SIZE = int(os.environ.get('LIGHTX_CACHE_SIZE', 64))
+    LIGHTX_CACHE_TTL = int(os.environ.get('LIGHTX_CACHE_TTL', 3600))
+    # Folder cache di disk (kosong = hanya in-memory) & umur file di disk (detik)
+    LIGHTX_CACHE_DIR = os.environ.get('LIGHTX_CACHE_DIR', '')
+    LIGHTX_CACHE_DISK_TTL = int(os.environ.get('LIGHTX_CACHE_DISK_TTL', 7 * 24 * 3600))
+    # Maksimal order LightX yang berjalan bersamaan dalam satu batch "coba semua style"
+    LIGHTX_BATCH_CONCURRENCY = int(os.environ.get('LIGHTX_BATCH_CONCURRENCY', 4))
+
+    # --- Blob storage gambar history ---
+    # 'gcs' = Firebase Storage (bucket di extensions), 'local' = folder lokal
+    BLOB_BACKEND = os.environ.get('BLOB_BACKEND', 'gcs')
+    BLOB_LOCAL_DIR = os.environ.get(
+        'BLOB_LOCAL_DIR', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'blobs')
+    )
+    # Thumbnail yang dibuat saat history disimpan (dipakai tampilan list)
+    HISTORY_THUMB_MAX_SIDE = int(os.environ.get('HISTORY_THUMB_MAX_SIDE', 160))
+    HISTORY_THUMB_QUALITY = int(os.environ.get('HISTORY_THUMB_QUALITY', 60))
+    # Paginasi GET /api/history: ukuran halaman default & batas maksimal
+    HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 20))
+    HISTORY_PAGE_MAX = int(os.environ.get('HISTORY_PAGE_MAX', 100))
+    # Hapus semua history: dokumen per WriteBatch (maks 500 operasi) & batch paralel
+    HISTORY_DELETE_BATCH_SIZE = int(os.environ.get('HISTORY_DELETE_BATCH_SIZE', 500))
+    HISTORY_DELETE_PARALLELISM = int(os.environ.get('HISTORY_DELETE_PARALLELISM', 4))
+
+    # --- Cache dokumen user (users/<email>) ---
+    # TTL pendek: batas data basi antar proses worker (detik)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+
+    # --- Admin panel ---
+    # Jumlah baris per halaman di daftar user & feedback
+    ADMIN_PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE', 25))
+    ADMIN_PAGE_MAX = int(os.environ.get('ADMIN_PAGE_MAX', 100))
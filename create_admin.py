@@ -1,5 +1,8 @@
+from datetime import datetime
+from google.api_core.exceptions import AlreadyExists
 from app import create_app
 from app.extensions import db, bcrypt
+from app.services.aggregates import aggregates
 
 # Inisialisasi aplikasi agar bisa konek ke Firebase
 app = create_app()
@@ -16,15 +19,24 @@ with app.app_context():
         "full_name": "Super Admin MyHeadStyle",
         "email": email,
         "password_hash": hashed_pw,
-        "role": "ADMIN"
+        "role": "ADMIN",
+        "updated_at": datetime.now()
     }
     
     # Masukkan data ke koleksi 'users' di Firestore
     # Kita pakai document email agar tidak duplikat
-    db.collection('users').document(email).set(admin_data)
+    user_doc_ref = db.collection('users').document(email)
+    try:
+        # Sama seperti register: dokumen + counter user + rollup signup dalam satu commit
+        aggregates.create('users', user_doc_ref, {**admin_data, "created_at": datetime.now()}, event='signups')
+        status = "Dibuat"
+    except AlreadyExists:
+        # Dijalankan ulang: perbarui password & role saja, counter tidak berubah
+        user_doc_ref.set(admin_data, merge=True)
+        status = "Diperbarui"
     
     print("\n" + "="*30)
-    print("✅ Akun Admin Berhasil Dibuat!")
+    print(f"✅ Akun Admin Berhasil {status}!")
     print(f"📧 Email: {email}")
     print(f"🔑 Password: {password}")
     print("="*30)
\ No newline at end of file
@@ -0,0 +1,319 @@
+"""
+Stub server LightX API v2 untuk development & pengujian lokal.
+
+Cara pakai:
+    python lightx_stub.py                          # jalan di http://127.0.0.1:8099
+    python lightx_stub.py --fail-rate 0.3          # 30% request dibalas 503/429 acak
+    python lightx_stub.py --delay 4 --jitter 2     # order selesai setelah 4±2 detik
+    python lightx_stub.py --check                  # uji client (retry, keep-alive, latency)
+    python lightx_stub.py --poll-check --delay 6 --jitter 4
+                                                   # polling tetap 3 detik vs jadwal adaptif
+
+Mode --check dan --poll-check memakai LightXClient langsung (tanpa Firebase)
+dan keluar dengan kode 1 jika ada hasil yang tidak sesuai harapan.
+
+Arahkan backend ke stub:
+    LIGHTX_BASE_URL=http://127.0.0.1:8099 python run.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import types
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Gambar "hasil" dummy (JPEG 1x1)
+RESULT_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c"
+    "140d0c0b0b0c1912130f141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27"
+    "393d38323c2e333432ffc0000b080001000101011100ffc4001f0000010501010101010100000000"
+    "000000000102030405060708090a0bffc400b5100002010303020403050504040000017d01020300"
+    "041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a"
+    "25262728292a3435363738393a434445464748494a535455565758595a636465666768696a737475"
+    "767778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9ba"
+    "c2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9faffda"
+    "0008010100003f00fbd3ffd9"
+)
+
+
+class StubState:
+    def __init__(self, delay=3.0, jitter=0.0, fail_rate=0.0):
+        self.delay = delay
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.orders = {}        # orderId → waktu selesai
+        self.polls = {}         # orderId → jumlah cek status
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, body, content_type="application/json", headers=None):
+            data = json.dumps(body).encode() if content_type == "application/json" else body
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def _maybe_fail(self):
+            with state.lock:
+                state.requests += 1
+            if random.random() < state.fail_rate:
+                if random.random() < 0.5:
+                    self._send(429, {"message": "Too Many Requests"}, headers={"Retry-After": "0"})
+                else:
+                    self._send(503, {"message": "Service Unavailable"})
+                return True
+            return False
+
+        def _base(self):
+            return f"http://{self.headers.get('Host')}"
+
+        def do_POST(self):
+            body = json.loads(self._read_body() or b"{}")
+            if self._maybe_fail():
+                return
+
+            if self.path.endswith("/uploadImageUrl"):
+                key = uuid.uuid4().hex
+                return self._send(200, {"statusCode": 2000, "body": {
+                    "uploadImage": f"{self._base()}/s3/{key}",
+                    "imageUrl": f"{self._base()}/s3/{key}.jpg"
+                }})
+
+            if self.path.endswith("/hairstyle"):
+                order_id = uuid.uuid4().hex
+                ready_at = time.monotonic() + max(0.0, state.delay + random.uniform(-state.jitter, state.jitter))
+                with state.lock:
+                    state.orders[order_id] = ready_at
+                return self._send(200, {"statusCode": 2000, "body": {"orderId": order_id}})
+
+            if self.path.endswith("/order-status"):
+                ready_at = state.orders.get(body.get("orderId"))
+                with state.lock:
+                    state.polls[body.get("orderId")] = state.polls.get(body.get("orderId"), 0) + 1
+                if ready_at is None:
+                    return self._send(200, {"statusCode": 5040, "message": "order not found"})
+                if time.monotonic() < ready_at:
+                    return self._send(200, {"statusCode": 2000, "body": {"status": "init"}})
+                return self._send(200, {"statusCode": 2000, "body": {
+                    "status": "active", "output": f"{self._base()}/result/{body['orderId']}.jpg"
+                }})
+
+            self._send(404, {"message": "not found"})
+
+        def do_PUT(self):
+            self._read_body()
+            if self._maybe_fail():
+                return
+            self._send(200, b"", content_type="text/plain")
+
+        def do_GET(self):
+            if self._maybe_fail():
+                return
+            if self.path.startswith("/result/"):
+                return self._send(200, RESULT_JPEG, content_type="image/jpeg")
+            self._send(404, {"message": "not found"})
+
+    return Handler
+
+
+def start_stub(port=8099, **kwargs):
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+# ==============================================================================
+# CEK CLIENT LIGHTX TERHADAP STUB
+# ==============================================================================
+def load_lightx_service():
+    """
+    Import app.services.lightx_service tanpa menjalankan app/__init__.py
+    (yang menginisialisasi Firebase lewat app.extensions). app/services tidak
+    punya __init__.py, jadi cukup daftarkan paket `app` kosong.
+    """
+    if "app" not in sys.modules:
+        package = types.ModuleType("app")
+        package.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")]
+        sys.modules["app"] = package
+    from app.services import lightx_service
+    return lightx_service
+
+
+def report(failures):
+    if failures:
+        print("\n❌ GAGAL:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1
+    print("\n✅ Semua cek lolos")
+    return 0
+
+
+def run_check(port, rounds=10, fail_rate=0.2):
+    lightx_service = load_lightx_service()
+    from app.services.poll_schedule import AdaptivePollSchedule
+
+    server, state = start_stub(port, delay=0.3, fail_rate=fail_rate)
+    # Retry ekstra: 4 kegagalan beruntun (0.2^4 per request) bukan bug client
+    client = lightx_service.LightXClient(
+        f"http://127.0.0.1:{port}", "stub", max_retries=6, backoff_base=0.05
+    )
+    schedule = AdaptivePollSchedule(min_interval=0.1, deadline=15.0)
+    ok = 0
+    try:
+        for _ in range(rounds):
+            image_url = client.upload_image(RESULT_JPEG)
+            order_id = image_url and client.create_order(image_url, "wolf cut")
+            output_url = order_id and client.wait_for_order(order_id, schedule, category="hair")
+            if output_url and client.download(output_url) == RESULT_JPEG:
+                ok += 1
+    finally:
+        server.shutdown()
+
+    stats = client.stats()
+    retries = sum(data["retries"] for data in stats.values())
+    print(f"\n{ok}/{rounds} generate berhasil dengan fail-rate {fail_rate:.0%}")
+    print(f"{state.requests} request lewat {state.connections} koneksi TCP (keep-alive)\n")
+    print(f"{'step':>11} | {'count':>5} | {'retry':>5} | {'p50 ms':>7} | {'p99 ms':>7}")
+    print("-" * 47)
+    for step, data in stats.items():
+        lat = data["latency_ms"]
+        print(f"{step:>11} | {lat['count']:>5} | {data['retries']:>5} | "
+              f"{lat['p50'] or 0:>7.2f} | {lat['p99'] or 0:>7.2f}")
+
+    failures = []
+    if ok != rounds:
+        failures.append(f"hanya {ok}/{rounds} generate berhasil")
+    if fail_rate > 0 and retries == 0:
+        failures.append("tidak ada retry padahal stub membalas 429/503")
+    if state.connections * 2 > state.requests:
+        failures.append(f"koneksi tidak dipakai ulang ({state.connections} koneksi untuk {state.requests} request)")
+    return report(failures)
+
+
+# ==============================================================================
+# POLLING TETAP (LAMA) vs JADWAL ADAPTIF
+# ==============================================================================
+def legacy_poll(client, order_id, max_retries=5, interval=3):
+    # Perilaku check_order_status lama: cek, lalu sleep 3 detik, maks 5 kali
+    for attempt in range(max_retries):
+        status, output_url = client.order_status(order_id)
+        if status == 'active':
+            return output_url
+        time.sleep(interval)
+    return None
+
+
+def run_poll_check(port, delay, jitter, waves=3, per_wave=10):
+    from concurrent.futures import ThreadPoolExecutor
+    lightx_service = load_lightx_service()
+    from app.services.poll_schedule import AdaptivePollSchedule
+
+    server, state = start_stub(port, delay=delay, jitter=jitter)
+    client = lightx_service.LightXClient(f"http://127.0.0.1:{port}", "stub")
+    schedule = AdaptivePollSchedule(deadline=max(15.0, (delay + jitter) * 2))
+
+    def create_order():
+        order_id = client.create_order("http://stub/image.jpg", "wolf cut")
+        return order_id, state.orders[order_id]
+
+    def adaptive(order_id):
+        return client.wait_for_order(order_id, schedule, category="hair")
+
+    def legacy(order_id):
+        return legacy_poll(client, order_id)
+
+    def measure(strategy):
+        order_id, ready_at = create_order()
+        output_url = strategy(order_id)
+        late = time.monotonic() - ready_at
+        return output_url is not None, max(0.0, late), state.polls.get(order_id, 0)
+
+    # Cetak log client disembunyikan agar tabel terbaca
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=per_wave) as pool:
+            results["tetap 3s"] = list(pool.map(
+                lambda _: measure(legacy), range(per_wave)
+            ))
+            # Gelombang awal = data waktu selesai untuk menyetel jadwal
+            for _ in range(waves):
+                results["adaptif"] = list(pool.map(lambda _: measure(adaptive), range(per_wave)))
+    finally:
+        sys.stdout = stdout
+        server.shutdown()
+
+    print(f"Order selesai setelah {delay}±{jitter} detik, {per_wave} order per strategi\n")
+    print(f"{'strategi':>9} | {'sukses':>6} | {'telat rata2 s':>13} | {'telat maks s':>12} | {'cek/order':>9}")
+    print("-" * 62)
+    summary = {}
+    for name, rows in results.items():
+        done = [r for r in rows if r[0]]
+        avg_late = sum(r[1] for r in done) / len(done) if done else 0
+        max_late = max((r[1] for r in done), default=0)
+        polls = sum(r[2] for r in rows) / len(rows)
+        summary[name] = (len(done), avg_late)
+        print(f"{name:>9} | {len(done):>3}/{len(rows):<2} | {avg_late:>13.2f} | {max_late:>12.2f} | {polls:>9.1f}")
+    print(f"\nStatistik jadwal: {schedule.stats()}")
+
+    # Jadwal adaptif (setelah disetel) harus menyelesaikan semua order dalam
+    # deadline, tidak kalah sukses dari polling tetap, dan mendeteksi lebih cepat
+    (legacy_ok, legacy_late), (adaptive_ok, adaptive_late) = summary["tetap 3s"], summary["adaptif"]
+    failures = []
+    if adaptive_ok != per_wave:
+        failures.append(f"adaptif hanya {adaptive_ok}/{per_wave} order selesai sebelum deadline")
+    if adaptive_ok < legacy_ok:
+        failures.append(f"adaptif ({adaptive_ok}) lebih sedikit sukses dari polling tetap ({legacy_ok})")
+    if adaptive_ok and legacy_ok and adaptive_late >= legacy_late:
+        failures.append(f"telat rata-rata adaptif {adaptive_late:.2f}s tidak lebih kecil dari {legacy_late:.2f}s")
+    return report(failures)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub server LightX API v2")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--delay', type=float, default=3.0, help="detik sampai order selesai")
+    parser.add_argument('--jitter', type=float, default=0.0, help="variasi acak delay (±detik)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="porsi request dibalas 429/503")
+    parser.add_argument('--check', action='store_true', help="jalankan cek client terhadap stub")
+    parser.add_argument('--poll-check', action='store_true', help="bandingkan polling tetap vs adaptif")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(run_check(args.port))
+    elif args.poll_check:
+        sys.exit(run_poll_check(args.port, args.delay, args.jitter))
+    else:
+        server, _ = start_stub(args.port, delay=args.delay, jitter=args.jitter, fail_rate=args.fail_rate)
+        print(f"Stub LightX jalan di http://127.0.0.1:{args.port} (Ctrl+C untuk berhenti)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,98 @@
+"""
+Migrasi gambar inline (data URI base64) di koleksi style_history ke blob storage.
+
+Dokumen lama menyimpan gambar di `result_image_url` / `photo_base64`. Skrip ini
+meng-upload gambar penuh + thumbnail, menulis `image_key` & `thumb_key`, lalu
+menghapus field inline dari dokumen.
+
+Cara pakai:
+    python migrate_history_images.py --dry-run          # hitung saja, tanpa menulis
+    python migrate_history_images.py --limit 100        # migrasi 100 dokumen pertama
+    python migrate_history_images.py --backend local    # upload ke folder lokal (BLOB_LOCAL_DIR)
+"""
+import argparse
+import base64
+import os
+
+INLINE_FIELDS = ('result_image_url', 'photo_base64')
+
+
+def decode_data_uri(value):
+    if not value:
+        return None
+    if ',' in value:
+        value = value.split(',', 1)[1]
+    try:
+        return base64.b64decode(value)
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrasi gambar history ke blob storage")
+    parser.add_argument('--dry-run', action='store_true', help="Tidak menulis apa pun")
+    parser.add_argument('--limit', type=int, default=0, help="Maksimal dokumen yang dimigrasi")
+    parser.add_argument('--backend', choices=('gcs', 'local'), help="Override BLOB_BACKEND")
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ['BLOB_BACKEND'] = args.backend
+
+    from app import create_app
+    from app.extensions import db
+    from app.services.history_images import upload_history_images
+    from app.services.image_workers import image_workers
+    from config import Config
+    from firebase_admin import firestore
+
+    app = create_app()
+
+    migrated, skipped, failed = 0, 0, 0
+    with app.app_context():
+        for doc in db.collection('style_history').stream():
+            if args.limit and migrated >= args.limit:
+                break
+
+            data = doc.to_dict()
+            field = next((f for f in INLINE_FIELDS if data.get(f)), None)
+            if field is None or data.get('image_key'):
+                skipped += 1
+                continue
+
+            img_bytes = decode_data_uri(data[field])
+            if not img_bytes:
+                print(f"⚠️ {doc.id}: {field} tidak bisa didecode")
+                failed += 1
+                continue
+
+            if args.dry_run:
+                print(f"[dry-run] {doc.id}: {field} ({len(img_bytes)} bytes)")
+                migrated += 1
+                continue
+
+            # Gambar penuh dipakai apa adanya (sudah dikompres saat disimpan dulu)
+            variants = image_workers.run('image_variants', img_bytes, variants=[
+                {"max_dim": Config.HISTORY_THUMB_MAX_SIDE, "quality": Config.HISTORY_THUMB_QUALITY}
+            ])
+            if variants is None:
+                print(f"⚠️ {doc.id}: {field} bukan gambar valid")
+                failed += 1
+                continue
+
+            keys = upload_history_images(img_bytes, variants[0])
+            doc.reference.update({
+                **keys,
+                **{f: firestore.DELETE_FIELD for f in INLINE_FIELDS if f in data}
+            })
+            print(f"✅ {doc.id}: {field} → {keys['image_key']}")
+            migrated += 1
+
+    print("\n" + "=" * 30)
+    print(f"Dimigrasi : {migrated}{' (dry-run)' if args.dry_run else ''}")
+    print(f"Dilewati  : {skipped}")
+    print(f"Gagal     : {failed}")
+    print("=" * 30)
+
+
+if __name__ == '__main__':
+    main()
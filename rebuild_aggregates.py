@@ -0,0 +1,29 @@
+"""
+Hitung ulang dokumen agregat dashboard admin (stats/dashboard) dari nol,
+dan isi ulang rollup harian `signups` dari users.created_at.
+
+Dipakai sekali setelah deploy pertama, atau jika counter dicurigai tidak
+sinkron (mis. data diubah manual lewat Firebase Console).
+
+Cara pakai:
+    python rebuild_aggregates.py
+"""
+from app import create_app
+from app.services.aggregates import aggregates
+from app.services.rollups import rollups
+
+# Inisialisasi aplikasi agar bisa konek ke Firebase
+app = create_app()
+
+with app.app_context():
+    data = aggregates.rebuild()
+    signup_days = rollups.backfill_signups()
+
+    print("\n" + "="*30)
+    print("✅ Agregat dashboard dihitung ulang")
+    print(f"👤 Users     : {data['users']}")
+    print(f"💇 Styles    : {data['styles']}")
+    print(f"💬 Feedbacks : {data['feedbacks']}")
+    print(f"⭐ Rating    : {data['ratings']}")
+    print(f"📅 Rollup signups diisi ulang untuk {signup_days} hari")
+    print("="*30)
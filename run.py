@@ -1,8 +1,12 @@
-from app import create_app, socketio
-
-app = create_app()
+from app import create_app
 
+# Worker gambar (multiprocessing spawn) meng-import ulang file ini sebagai
+# __mp_main__, jadi app hanya dibangun saat dijalankan langsung
 if __name__ == '__main__':
+    from app.extensions import socketio
+
+    app = create_app()
+
     # --- TAMBAHKAN KODE INI UNTUK CEK ALAMAT ---
     with app.app_context():
         print("\n=== DAFTAR ALAMAT API YANG AKTIF ===")